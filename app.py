@@ -1,19 +1,72 @@
-from flask import Flask, request, jsonify
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, get_jwt
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Flask, request, jsonify, Response, abort, g, stream_with_context
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required
 from models import db, User   
-from models import db, Game, Order, OrderItem
-from flask_migrate import Migrate
+from models import db, Game, Order, OrderItem, ArchivedOrder, ArchivedOrderItem
+from cache import LocalCache
+from config import load_config
+from metrics import init_metrics
+from ratelimit import rate_limiter, priority, LOW, HIGH
+from auth import init_auth, admin_required, owner_or_admin, can_access, current_is_admin, revoke_user_tokens
+from passwords import PasswordHasher
+from schemas import ma, FastJSONProvider, FieldSelectionError, UserSchema, GameSchema, OrderSchema, get_schema, schema_for, requested_fields
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.exc import IntegrityError
+from search import game_search
+import reports
+import catalog
+import jobs
+import archive
+from idempotency import idempotent, idempotency_cli, stage_response
+from stock import PENDING, CANCELLED, OrderError, parse_order_items, load_stock, check_stock, reserve_stock, with_stock_retry, transition_order, discard_order
+from flask_migrate import Migrate, stamp
+from datetime import datetime
+import base64
+import click
+import codecs
+import hashlib
+import json
 
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 migrate = Migrate(app, db)
 
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
-app.config['JWT_SECRET_KEY'] = 'david3010'  
+load_config(app)
+init_metrics(app)
+rate_limiter.init_app(app)
 
 db.init_app(app)
+ma.init_app(app)
 jwt = JWTManager(app)
+init_auth(app, jwt)
+passwords = PasswordHasher(app)
+game_search.init_app(app)
+app.cli.add_command(reports.reports_cli)
+app.cli.add_command(catalog.catalog_cli)
+app.cli.add_command(jobs.jobs_cli)
+app.cli.add_command(idempotency_cli)
+app.cli.add_command(archive.archive_cli)
+
+# Caché de lectura para el detalle de juegos. Se puede sustituir por
+# cualquier implementación de cache.CacheBackend compartida entre procesos.
+game_cache = LocalCache(
+    max_entries=app.config['GAME_CACHE_SIZE'],
+    ttl=app.config['GAME_CACHE_TTL']
+)
+
+
+def game_cache_key(game_id):
+    return f"game:{game_id}"
+
+
+def invalidate_games(game_ids):
+    for game_id in game_ids:
+        game_cache.delete(game_cache_key(game_id))
+
+
+@app.errorhandler(FieldSelectionError)
+def handle_field_selection(e):
+    return jsonify({"msg": f"Selección de campos inválida: {e}"}), 400
 
 
 #########################################################
@@ -22,20 +75,33 @@ jwt = JWTManager(app)
 #                                                       #
 #########################################################
 
+def active_user_or_404(user_id):
+    # Los usuarios borrados (borrado lógico) no existen para la API
+    return User.query.filter(User.id == user_id, User.deleted_at.is_(None)).first_or_404()
+
 
 # Registro
 @app.route('/api/users/register', methods=['POST'])
+@priority(LOW)
+@idempotent()
+@rate_limiter.limit('RATELIMIT_REGISTER')
 def register():
     data = request.get_json(force=True)
 
     if not data or not all(k in data for k in ('username', 'email', 'password')):
         return jsonify({"msg": "Datos incompletos"}), 400
 
-    hashed_pw = generate_password_hash(data['password'])
+    hashed_pw = passwords.hash(data['password'])
     new_user = User(username=data['username'], email=data['email'], password=hashed_pw)
     db.session.add(new_user)
-    db.session.commit()
-    return jsonify({"msg": "Usuario registrado"}), 201
+    body = {"msg": "Usuario registrado"}
+    stage_response(body, 201)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"msg": "El nombre de usuario o el email ya están registrados"}), 409
+    return jsonify(body), 201
 
 @app.route('/')
 def index():
@@ -43,14 +109,23 @@ def index():
 
 # Login
 @app.route('/api/users/login', methods=['POST'])
+@priority(LOW)
+@rate_limiter.limit('RATELIMIT_LOGIN')
 def login():
     data = request.get_json(force=True)
 
     if not data or not all(k in data for k in ('username', 'password')):
         return jsonify({"msg": "Datos incompletos"}), 400
 
-    user = User.query.filter_by(username=data['username']).first()
-    if user and check_password_hash(user.password, data['password']):
+    user = User.query.filter_by(username=data['username'], deleted_at=None).first()
+    if user is None:
+        passwords.reject(data['password'])
+    elif passwords.verify(user.password, data['password']):
+        # Si el hash guardado usa parámetros antiguos se regenera ahora que
+        # tenemos la contraseña en claro
+        if passwords.needs_rehash(user.password):
+            user.password = passwords.hash(data['password'])
+            db.session.commit()
         token = create_access_token(
             identity=str(user.id),   
             additional_claims={"is_admin": user.is_admin}
@@ -60,59 +135,60 @@ def login():
 
 # Obtener usuario
 @app.route('/api/users/<int:user_id>', methods=['GET'])
-@jwt_required()
+@owner_or_admin()
 def get_user(user_id):
-    current_user_id = int(get_jwt_identity())   
-    claims = get_jwt()
-    is_admin = claims.get("is_admin", False)
-
-    if current_user_id != user_id and not is_admin:
-        return jsonify({"msg": "No autorizado"}), 403
-
-    user = User.query.get_or_404(user_id)
-    return jsonify({
-        "id": user.id,
-        "username": user.username,
-        "email": user.email,
-        "is_admin": user.is_admin
-    })
+    user = active_user_or_404(user_id)
+    return jsonify(schema_for(UserSchema).dump(user))
 
 # Actualizar usuario
 @app.route('/api/users/<int:user_id>', methods=['PUT'])
-@jwt_required()
+@owner_or_admin()
 def update_user(user_id):
-    current_user_id = int(get_jwt_identity())  
-    claims = get_jwt()
-    is_admin = claims.get("is_admin", False)
-
-    if current_user_id != user_id and not is_admin:
-        return jsonify({"msg": "No autorizado"}), 403
-
-    user = User.query.get_or_404(user_id)
+    user = active_user_or_404(user_id)
     data = request.get_json(force=True)
 
     if "email" in data:
         user.email = data["email"]
     if "password" in data:
-        user.password = generate_password_hash(data["password"])
+        user.password = passwords.hash(data["password"])
 
     db.session.commit()
+    if "password" in data:
+        # Los tokens emitidos con la contraseña anterior dejan de valer
+        revoke_user_tokens(user_id)
     return jsonify({"msg": "Usuario actualizado"})
 
 #Eliminar usuario
 
 @app.route('/api/users/<int:user_id>', methods=['DELETE'])
-@jwt_required()
+@admin_required()
 def delete_user(user_id):
-    current_user_id = get_jwt_identity() 
-    current_user = User.query.get(current_user_id)
-
-    if not current_user or not current_user.is_admin:
-        return jsonify({"msg": "No autorizado"}), 403
-
-    user = User.query.get_or_404(user_id)
-    db.session.delete(user)
-    db.session.commit()
+    # Borrado lógico: el usuario y su historial de pedidos se conservan (el
+    # nombre y el email siguen reservados). Los pedidos pendientes se
+    # cancelan para devolver su reserva de stock.
+    def write():
+        user = active_user_or_404(user_id)
+        released = {}
+        pending = Order.query.filter(
+            Order.user_id == user_id,
+            Order.deleted_at.is_(None),
+            db.or_(Order.status == PENDING, Order.status.is_(None))
+        ).all()
+        for order in pending:
+            old_status = order.status
+            for game_id, quantity in transition_order(order, CANCELLED).items():
+                released[game_id] = released.get(game_id, 0) + quantity
+            reports.record_status_change(order, old_status)
+        user.deleted_at = datetime.utcnow()
+        db.session.commit()
+        return released
+
+    try:
+        released = with_stock_retry(write)
+    except OrderError as e:
+        return jsonify({"msg": e.msg}), e.status
+    invalidate_games(released)
+    revoke_user_tokens(user_id)
     return jsonify({"msg": "Usuario eliminado"})
 
 #########################################################
@@ -123,7 +199,7 @@ def delete_user(user_id):
 
 # Crear un nuevo juego
 @app.route('/api/games', methods=['POST'])
-@jwt_required() 
+@admin_required()
 def create_game():
     data = request.get_json(force=True)
     
@@ -143,33 +219,206 @@ def create_game():
 
     return jsonify({
         "msg": "Videojuego creado",
-        "game": {
-            "id": new_game.id,
-            "title": new_game.title,
-            "description": new_game.description,
-            "price": new_game.price,
-            "stock": new_game.stock
-        }
+        "game": get_schema(GameSchema).dump(new_game)
     }), 201
 
 
+# Importación masiva (CSV o NDJSON, upsert por título). La respuesta es
+# NDJSON con un resumen por lote según se van confirmando.
+
+IMPORT_BATCH_MAX = 10000
+
+@app.route('/api/games/import', methods=['POST'])
+@priority(LOW)
+@admin_required()
+def import_games():
+    fmt = request.args.get('format') or catalog.detect_format(request.mimetype)
+    try:
+        batch_size = int(request.args.get('batch_size', catalog.IMPORT_BATCH_SIZE))
+    except ValueError:
+        return jsonify({"msg": "Parámetro batch_size inválido"}), 400
+    if fmt not in catalog.FORMATS:
+        return jsonify({"msg": "Formato no soportado (csv, ndjson)"}), 400
+    batch_size = max(1, min(batch_size, IMPORT_BATCH_MAX))
+
+    def generate():
+        # Decodificación incremental por líneas: el stream de entrada de
+        # algunos servidores (gunicorn) no admite io.TextIOWrapper
+        stream = codecs.iterdecode(request.stream, 'utf-8')
+        records = catalog.read_records(stream, fmt)
+        for summary in catalog.import_games(records, batch_size, on_commit=invalidate_games):
+            yield json.dumps(summary) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+# Exportación del catálogo completo, por bloques
+@app.route('/api/games/export', methods=['GET'])
+@priority(LOW)
+@admin_required()
+def export_games():
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in catalog.FORMATS:
+        return jsonify({"msg": "Formato no soportado (csv, ndjson)"}), 400
+    return Response(
+        stream_with_context(catalog.export_games(fmt)),
+        mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+        headers={"Content-Disposition": f"attachment; filename=catalogo.{fmt}"}
+    )
+
+
+# Listar juegos (paginación por cursor). Sin q el orden es Game.id y el
+# cursor es el último id: los filtros de precio y stock se evalúan sobre la
+# clave primaria desde el cursor. Con q (prefijo del título) el orden es
+# (title, id) y el cursor codifica ambos, para que ix_game_title_id sirva
+# el rango y el orden sin ordenar todas las coincidencias.
+
+GAMES_PAGE_DEFAULT = 20
+GAMES_PAGE_MAX = 100
+
+
+def encode_title_cursor(row):
+    raw = f"{row.title}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_title_cursor(cursor):
+    title, game_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+    return title, int(game_id)
+
+
+@app.route('/api/games', methods=['GET'])
+def list_games():
+    prefix = request.args.get('q', '')
+    cursor = request.args.get('cursor')
+    try:
+        limit = int(request.args.get('limit', GAMES_PAGE_DEFAULT))
+        min_price = request.args.get('min_price', type=float)
+        max_price = request.args.get('max_price', type=float)
+        if prefix:
+            after = decode_title_cursor(cursor) if cursor else None
+        else:
+            after = int(cursor or 0)
+    except (ValueError, UnicodeDecodeError):
+        return jsonify({"msg": "Parámetros de paginación inválidos"}), 400
+
+    limit = max(1, min(limit, GAMES_PAGE_MAX))
+    in_stock = request.args.get('in_stock', '').lower() in ('1', 'true', 'si', 'sí')
+
+    # Solo las columnas que se devuelven (respetando ?fields=), sin hidratar objetos Game
+    schema = schema_for(GameSchema, many=True)
+    columns = [getattr(Game, name) for name in schema.fields]
+    for name in ('id', 'title') if prefix else ('id',):
+        if name not in schema.fields:
+            columns.append(getattr(Game, name))
+    query = db.session.query(*columns)
+
+    if min_price is not None:
+        query = query.filter(Game.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Game.price <= max_price)
+    if in_stock:
+        query = query.filter(Game.stock > 0)
+    if prefix:
+        # Rango en lugar de LIKE; el límite inferior es el cursor, así el
+        # recorrido del índice empieza en la página pedida
+        lower = max(prefix, after[0]) if after else prefix
+        query = query.filter(Game.title >= lower, Game.title < prefix + '\uffff')
+        if after:
+            query = query.filter(db.tuple_(Game.title, Game.id) > after)
+        query = query.order_by(Game.title, Game.id)
+    else:
+        query = query.filter(Game.id > after).order_by(Game.id)
+
+    # Se pide una fila extra para saber si hay página siguiente
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_title_cursor(rows[-1]) if prefix else rows[-1].id
+    return jsonify({
+        "games": schema.dump(rows),
+        "next_cursor": next_cursor
+    })
+
+
+# Buscar juegos por título y descripción (ranking BM25, admite prefijos)
+
+SEARCH_PAGE_DEFAULT = 20
+SEARCH_PAGE_MAX = 50
+
+@app.route('/api/games/search', methods=['GET'])
+@priority(LOW)
+def search_games():
+    text = request.args.get('q', '').strip()
+    if not text:
+        return jsonify({"msg": "Falta el parámetro de búsqueda q"}), 400
+
+    try:
+        limit = int(request.args.get('limit', SEARCH_PAGE_DEFAULT))
+        offset = max(0, int(request.args.get('offset', 0)))
+    except ValueError:
+        return jsonify({"msg": "Parámetros de paginación inválidos"}), 400
+
+    limit = max(1, min(limit, SEARCH_PAGE_MAX))
+    ids = game_search.search(text, limit + 1, offset)
+    has_more = len(ids) > limit
+    ids = ids[:limit]
+
+    schema = schema_for(GameSchema, many=True)
+    columns = [getattr(Game, name) for name in schema.fields]
+    if 'id' not in schema.fields:
+        columns.append(Game.id)
+    rows = {row.id: row for row in db.session.query(*columns).filter(Game.id.in_(ids))} if ids else {}
+
+    return jsonify({
+        "games": schema.dump([rows[game_id] for game_id in ids if game_id in rows]),
+        "next_offset": offset + limit if has_more else None
+    })
+
+
 # Visualizar un juego específico
 @app.route('/api/games/<int:game_id>', methods=['GET'])
 def get_game(game_id):
-    game = Game.query.get_or_404(game_id)
-    return jsonify({
-        "id": game.id,
-        "title": game.title,
-        "description": game.description,
-        "price": game.price,
-        "stock": game.stock
-    })
+    key = game_cache_key(game_id)
+    cached = game_cache.get(key)
+    if cached is None:
+        # La generación se toma antes de leer: si una escritura invalida el
+        # juego mientras tanto, la lectura puede ser anterior a ella y no se
+        # guarda. Lo que se guarda en caché se lee del principal: una réplica
+        # atrasada dejaría el precio anterior en caché hasta que caduque
+        generation = game_cache.generation(key)
+        g.use_replica = False
+        game = Game.query.get_or_404(game_id)
+        payload = get_schema(GameSchema).dump(game)
+        body = app.json.dumps(payload)
+        cached = (payload, body, hashlib.sha1(body.encode()).hexdigest())
+        game_cache.set(key, cached, generation=generation)
+
+    payload, body, etag = cached
+    if requested_fields():
+        # La caché guarda el documento completo; la selección se aplica encima
+        body = app.json.dumps(schema_for(GameSchema).dump(payload))
+        etag = hashlib.sha1(body.encode()).hexdigest()
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    # Devuelve 304 si el cliente envía un If-None-Match que coincide
+    return response.make_conditional(request)
+
+
+# Estadísticas de la caché de juegos
+@app.route('/api/cache/stats', methods=['GET'])
+@admin_required()
+def cache_stats():
+    return jsonify(game_cache.stats())
 
 
 #Actualizar el juego
 
 @app.route('/api/games/<int:game_id>', methods=['PUT'])
-@jwt_required() 
+@admin_required()
 def update_game(game_id):
     game = Game.query.get_or_404(game_id)   
     data = request.get_json(force=True)
@@ -183,30 +432,37 @@ def update_game(game_id):
     if 'stock' in data:
         game.stock = int(data['stock'])
 
-    db.session.commit()
+    try:
+        db.session.commit()
+    except StaleDataError:
+        # Otro escritor (p. ej. un pedido) cambió la versión del juego
+        db.session.rollback()
+        return jsonify({"msg": "El juego fue modificado por otra operación, vuelve a intentarlo"}), 409
+    invalidate_games([game.id])
 
     return jsonify({
         "msg": "Videojuego actualizado",
-        "game": {
-            "id": game.id,
-            "title": game.title,
-            "description": game.description,
-            "price": game.price,
-            "stock": game.stock
-        }
+        "game": get_schema(GameSchema).dump(game)
     })
 
 #Eliminar el juego
 
 @app.route('/api/games/<int:game_id>', methods=['DELETE'])
-@jwt_required()  
+@admin_required()
 def delete_game(game_id):
     game = Game.query.get_or_404(game_id)
+    title = game.title
 
     db.session.delete(game)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except StaleDataError:
+        # Otro escritor (p. ej. un pedido) cambió la versión del juego
+        db.session.rollback()
+        return jsonify({"msg": "El juego fue modificado por otra operación, vuelve a intentarlo"}), 409
+    invalidate_games([game_id])
 
-    return jsonify({"msg": f"Videojuego '{game.title}' eliminado con éxito"})
+    return jsonify({"msg": f"Videojuego '{title}' eliminado con éxito"})
 
 
 #########################################################
@@ -218,7 +474,15 @@ def delete_game(game_id):
 
 # Crear el pedido
 
+def insert_order_items(rows):
+    db.session.execute(db.insert(OrderItem), rows)
+
+
 @app.route('/api/orders', methods=['POST'])
+@priority(HIGH)
+@jwt_required()
+@idempotent(per_user=True)
+@rate_limiter.limit('RATELIMIT_ORDERS', by='user')
 def create_order():
     data = request.get_json(force=True)
 
@@ -226,77 +490,385 @@ def create_order():
         return jsonify({"msg": "El pedido debe contener user_id e items"}), 400
 
     user_id = data["user_id"]
+    try:
+        if not can_access(int(user_id)):
+            return jsonify({"msg": "No autorizado"}), 403
+    except (TypeError, ValueError):
+        return jsonify({"msg": "user_id inválido"}), 400
 
-    user = User.query.get(user_id)
+    user = User.query.filter(User.id == user_id, User.deleted_at.is_(None)).first()
     if not user:
         return jsonify({"msg": f"Usuario con id {user_id} no existe"}), 404
 
-    new_order = Order(user_id=user_id)
-    db.session.add(new_order)
-    db.session.flush()  
+    # Se valida todo el pedido antes de escribir nada
+    try:
+        lines, quantities = parse_order_items(data["items"])
+        stock = load_stock(list(quantities))
+        check_stock(quantities, stock)
+    except OrderError as e:
+        return jsonify({"msg": e.msg}), e.status
+
+    # Una sola transacción: o se confirma todo o se deshace todo
+    def write():
+        new_order = Order(user_id=user_id)
+        db.session.add(new_order)
+        db.session.flush()
+
+        reserve_stock(quantities)
+        insert_order_items([
+            {"order_id": new_order.id, "game_id": game_id, "quantity": quantity, "unit_price": stock[game_id]["price"]}
+            for game_id, quantity in lines
+        ])
+        reports.record_new_orders([(new_order, {
+            game_id: (quantity, quantity * stock[game_id]["price"]) for game_id, quantity in quantities.items()
+        })])
+        order_id = new_order.id
+        jobs.enqueue_many(jobs.order_jobs(order_id))
+        # La respuesta de la Idempotency-Key se confirma junto con el pedido
+        body = {"msg": "Pedido creado", "order_id": order_id}
+        stage_response(body, 201)
+        # Tras el commit el objeto está expirado; leer su id lanzaría otro SELECT
+        db.session.commit()
+        return body
+
+    try:
+        body = with_stock_retry(write)
+    except OrderError as e:
+        return jsonify({"msg": e.msg}), e.status
+    invalidate_games(quantities)
+
+    return jsonify(body), 201
+
+
+
+# Carga masiva de pedidos (NDJSON: un pedido por línea)
+
+BULK_CHUNK_SIZE = 500
+_INVALID_JSON = object()
+
+
+def place_orders_chunk(entries):
+    # entries: lista de (linea, pedido) ya decodificados. Devuelve un
+    # resultado por entrada, en el mismo orden, tras una única transacción.
+    results = {}
+    parsed = []
+    for line_no, data in entries:
+        try:
+            if data is _INVALID_JSON:
+                raise OrderError("Línea JSON inválida")
+            if not isinstance(data, dict) or "items" not in data or "user_id" not in data:
+                raise OrderError("El pedido debe contener user_id e items")
+            try:
+                user_id = int(data["user_id"])
+            except (TypeError, ValueError):
+                raise OrderError("user_id inválido")
+            lines, quantities = parse_order_items(data["items"])
+            parsed.append((line_no, user_id, lines, quantities))
+        except OrderError as e:
+            results[line_no] = {"line": line_no, "error": e.msg, "status": e.status}
+
+    user_ids = {user_id for _, user_id, _, _ in parsed}
+    game_ids = list({game_id for _, _, _, quantities in parsed for game_id in quantities})
+    existing_users = {
+        row.id for row in db.session.query(User.id).filter(User.id.in_(user_ids), User.deleted_at.is_(None))
+    } if user_ids else set()
+
+    candidates = []
+    for line_no, user_id, lines, quantities in parsed:
+        if user_id not in existing_users:
+            results[line_no] = {"line": line_no, "error": f"Usuario con id {user_id} no existe", "status": 404}
+        else:
+            candidates.append((line_no, user_id, lines, quantities))
+
+    def order_lines(lines, stock):
+        per_game = {}
+        for game_id, quantity in lines:
+            reports.add_line(per_game, game_id, quantity, stock[game_id]["price"])
+        return per_game
+
+    def write():
+        # El stock se lee dentro de la unidad de trabajo y la reserva se hace
+        # con las versiones de esa lectura: si otra compra lo cambia antes del
+        # UPDATE, with_stock_retry repite la selección con el stock nuevo y
+        # solo se rechazan los pedidos que ya no caben. El stock en memoria se
+        # comparte entre los pedidos del lote, así que un pedido posterior ve
+        # lo que ya han consumido los anteriores.
+        stock = load_stock(game_ids)
+        available = {game_id: dict(game) for game_id, game in stock.items()}
+        accepted = []
+        rejected = {}
+        totals = {}
+        for line_no, user_id, lines, quantities in candidates:
+            try:
+                check_stock(quantities, available)
+            except OrderError as e:
+                rejected[line_no] = {"line": line_no, "error": e.msg, "status": e.status}
+                continue
+            accepted.append((line_no, user_id, lines))
+            for game_id, quantity in quantities.items():
+                totals[game_id] = totals.get(game_id, 0) + quantity
+        if not accepted:
+            return [], accepted, rejected, totals
+
+        orders = [Order(user_id=user_id) for _, user_id, _ in accepted]
+        db.session.add_all(orders)
+        db.session.flush()
+
+        reserve_stock(totals, stock)
+        insert_order_items([
+            {"order_id": order.id, "game_id": game_id, "quantity": quantity, "unit_price": stock[game_id]["price"]}
+            for order, (_, _, lines) in zip(orders, accepted)
+            for game_id, quantity in lines
+        ])
+        reports.record_new_orders([
+            (order, order_lines(lines, stock)) for order, (_, _, lines) in zip(orders, accepted)
+        ])
+        order_ids = [order.id for order in orders]
+        jobs.enqueue_many([job for order_id in order_ids for job in jobs.order_jobs(order_id)])
+        db.session.commit()
+        return order_ids, accepted, rejected, totals
+
+    if candidates:
+        try:
+            order_ids, accepted, rejected, totals = with_stock_retry(write)
+        except OrderError as e:
+            for line_no, _, _, _ in candidates:
+                results[line_no] = {"line": line_no, "error": e.msg, "status": e.status}
+        else:
+            results.update(rejected)
+            invalidate_games(totals)
+            for order_id, (line_no, _, _) in zip(order_ids, accepted):
+                results[line_no] = {"line": line_no, "order_id": order_id}
+
+    return [results[line_no] for line_no, _ in entries]
+
+
+@app.route('/api/orders/bulk', methods=['POST'])
+@priority(LOW)
+@admin_required()
+def create_orders_bulk():
+    def generate():
+        chunk = []
+        # Se lee el cuerpo línea a línea, sin cargarlo entero en memoria
+        for line_no, raw in enumerate(request.stream, start=1):
+            raw = raw.strip()
+            if not raw:
+                continue
+            try:
+                chunk.append((line_no, json.loads(raw)))
+            except ValueError:
+                chunk.append((line_no, _INVALID_JSON))
+            if len(chunk) >= BULK_CHUNK_SIZE:
+                for result in place_orders_chunk(chunk):
+                    yield json.dumps(result) + "\n"
+                chunk = []
+        if chunk:
+            for result in place_orders_chunk(chunk):
+                yield json.dumps(result) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
-    for item in data["items"]:
-        game = Game.query.get(item["game_id"])
-        if not game:
-            return jsonify({"msg": f"Juego con id {item['game_id']} no existe"}), 404
-        if game.stock < item["quantity"]:
-            return jsonify({"msg": f"No hay suficiente stock para {game.title}"}), 400
 
-        game.stock -= item["quantity"]
+# Visualizar un pedido 
 
-        order_item = OrderItem(order_id=new_order.id, game_id=game.id, quantity=item["quantity"])
-        db.session.add(order_item)
+@app.route('/api/orders/<int:order_id>', methods=['GET'])
+@jwt_required()
+def get_order(order_id):
+    order = archive.find_order(order_id)
+    if order is None:
+        abort(404)
+    if not can_access(order.user_id):
+        return jsonify({"msg": "No autorizado"}), 403
+    return jsonify(schema_for(OrderSchema).dump(order))
 
-    db.session.commit()
 
-    return jsonify({"msg": "Pedido creado", "order_id": new_order.id}), 201
+# Historial de pedidos de un usuario (paginación por cursor sobre created_at, id)
 
+ORDERS_PAGE_DEFAULT = 20
+ORDERS_PAGE_MAX = 100
 
 
-# Visualizar un pedido 
+def encode_order_cursor(order):
+    raw = f"{order.created_at.isoformat()}|{order.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_order_cursor(cursor):
+    created_at, order_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(created_at), int(order_id)
+
+
+@app.route('/api/orders/user/<int:user_id>', methods=['GET'])
+@owner_or_admin()
+def get_user_orders(user_id):
+    try:
+        limit = int(request.args.get('limit', ORDERS_PAGE_DEFAULT))
+        cursor = request.args.get('cursor')
+        after = decode_order_cursor(cursor) if cursor else None
+    except (ValueError, UnicodeDecodeError):
+        return jsonify({"msg": "Parámetros de paginación inválidos"}), 400
+
+    limit = max(1, min(limit, ORDERS_PAGE_MAX))
+
+    # Recorre ix_order_user_id_created_at (y su equivalente en el archivo) de
+    # más reciente a más antiguo; items y juegos se cargan con consultas IN
+    # para toda la página
+    orders = archive.user_orders_page(user_id, limit, after, request.args.get('status'))
+    has_more = len(orders) > limit
+    orders = orders[:limit]
 
-@app.route('/api/orders/<int:order_id>', methods=['GET'])
-@jwt_required()
-def get_order(order_id):
-    order = Order.query.get_or_404(order_id)
     return jsonify({
-        "id": order.id,
-        "user_id": order.user_id,
-        "created_at": order.created_at,
-        "status": order.status,
-        "items": [
-            {"game_id": item.game_id, "quantity": item.quantity}
-            for item in order.items
-        ]
+        "orders": schema_for(OrderSchema, many=True).dump(orders),
+        "next_cursor": encode_order_cursor(orders[-1]) if has_more else None
     })
 
 
 # Actualizar el pedido
 
 @app.route('/api/orders/<int:order_id>', methods=['PUT'])
+@priority(HIGH)
 @jwt_required()
 def update_order(order_id):
-    order = Order.query.get_or_404(order_id)
     data = request.get_json(force=True)
 
-    if "status" in data:
-        order.status = data["status"]
-
-    db.session.commit()
-    return jsonify({"msg": "Pedido actualizado", "status": order.status})
+    def write():
+        order = archive.live_order(order_id)
+        if order is None:
+            # Los pedidos archivados están terminados: no admiten cambios
+            archived = archive.archived_order(order_id)
+            if archived is None:
+                abort(404)
+            if not can_access(archived.user_id):
+                raise OrderError("No autorizado", 403)
+            raise OrderError("El pedido está archivado y ya no se puede modificar", 409)
+        if not can_access(order.user_id):
+            raise OrderError("No autorizado", 403)
+        # El propietario solo puede cancelar; el resto de transiciones son de admin
+        if "status" in data and data["status"] != CANCELLED and not current_is_admin():
+            raise OrderError("No autorizado", 403)
+        released = {}
+        if "status" in data:
+            old_status = order.status
+            released = transition_order(order, data["status"])
+            reports.record_status_change(order, old_status)
+            if order.status != old_status:
+                jobs.enqueue_many(jobs.order_jobs(order.id, order.status))
+        status = order.status
+        db.session.commit()
+        return status, released
+
+    try:
+        status, released = with_stock_retry(write)
+    except OrderError as e:
+        return jsonify({"msg": e.msg}), e.status
+    invalidate_games(released)
+
+    return jsonify({"msg": "Pedido actualizado", "status": status})
 
 # Eliminar el pedido
 
 @app.route('/api/orders/<int:order_id>', methods=['DELETE'])
 @jwt_required()
 def delete_order(order_id):
-    order = Order.query.get_or_404(order_id)
-    db.session.delete(order)
-    db.session.commit()
-    return jsonify({"msg": f"Pedido {order.id} eliminado"})
+    # Borrado lógico, también para los pedidos ya archivados
+    def write():
+        order = archive.live_order(order_id) or archive.archived_order(order_id)
+        if order is None:
+            abort(404)
+        if not can_access(order.user_id):
+            raise OrderError("No autorizado", 403)
+        if isinstance(order, ArchivedOrder):
+            reports.record_deletion(order, reports.order_lines(order.id, ArchivedOrderItem))
+            order.deleted_at = datetime.utcnow()
+            released = {}
+        else:
+            reports.record_deletion(order)
+            released = discard_order(order)
+        db.session.commit()
+        return released
+
+    try:
+        try:
+            released = with_stock_retry(write)
+        except StaleDataError:
+            # El archivado movió el pedido entre la lectura y la escritura;
+            # ahora está en el archivo
+            released = with_stock_retry(write)
+    except OrderError as e:
+        return jsonify({"msg": e.msg}), e.status
+    invalidate_games(released)
+
+    return jsonify({"msg": f"Pedido {order_id} eliminado"})
+
 
+#########################################################
+#                                                       #
+#                       REPORTES                        #
+#                                                       #
+#########################################################
 
+# Ventas de un juego
+@app.route('/api/reports/games/<int:game_id>', methods=['GET'])
+@admin_required()
+def report_game(game_id):
+    row = db.session.get(reports.SalesByGame, game_id)
+    return jsonify(reports.serialize(row, "game_id", game_id))
+
+
+# Juegos más vendidos
+@app.route('/api/reports/games/top', methods=['GET'])
+@admin_required()
+def report_top_games():
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), 100))
+    except ValueError:
+        return jsonify({"msg": "Parámetro limit inválido"}), 400
+    rows = reports.SalesByGame.query.order_by(
+        reports.SalesByGame.units_sold.desc()
+    ).limit(limit).all()
+    return jsonify([reports.serialize(row, "game_id", row.game_id) for row in rows])
+
+
+# Ventas por día
+@app.route('/api/reports/daily', methods=['GET'])
+@admin_required()
+def report_daily():
+    try:
+        start, end = reports.parse_day_range(request.args.get('from'), request.args.get('to'))
+    except ValueError:
+        return jsonify({"msg": "Rango de fechas inválido (YYYY-MM-DD, máximo 366 días)"}), 400
+    rows = reports.SalesByDay.query.filter(
+        reports.SalesByDay.day.between(start, end)
+    ).order_by(reports.SalesByDay.day).all()
+    return jsonify([reports.serialize(row, "day", row.day.isoformat()) for row in rows])
+
+
+# Resumen de un periodo
+@app.route('/api/reports/summary', methods=['GET'])
+@admin_required()
+def report_summary():
+    try:
+        start, end = reports.parse_day_range(request.args.get('from'), request.args.get('to'))
+    except ValueError:
+        return jsonify({"msg": "Rango de fechas inválido (YYYY-MM-DD, máximo 366 días)"}), 400
+    totals = db.session.query(*[
+        db.func.coalesce(db.func.sum(getattr(reports.SalesByDay, name)), 0)
+        for name in reports.METRICS
+    ]).filter(reports.SalesByDay.day.between(start, end)).one()
+    summary = {"from": start.isoformat(), "to": end.isoformat()}
+    summary.update(zip(reports.METRICS, totals))
+    return jsonify(summary)
+
+
+# El esquema se crea una vez al desplegar, no al arrancar el servidor
+@app.cli.command('init-db')
+def init_db_command():
+    """Crea las tablas en una BD nueva y la marca con la última migración."""
+    db.create_all()
+    stamp()
+    click.echo("Base de datos creada")
+
+
+# Servidor de desarrollo; en producción usar wsgi.py
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
     app.run(debug=True)
\ No newline at end of file
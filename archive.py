@@ -0,0 +1,175 @@
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy.orm import selectinload
+
+from models import db, Order, OrderItem, ArchivedOrder, ArchivedOrderItem
+from stock import COMPLETED, CANCELLED
+
+# Archivado de pedidos: los terminados (completados o cancelados) y los
+# borrados más antiguos que ARCHIVE_AFTER_DAYS se mueven a archived_order /
+# archived_order_item para que las tablas en uso sigan siendo pequeñas.
+# Cada lote es una transacción (INSERT ... SELECT y DELETE), así que un
+# pedido está siempre en una de las dos tablas y conserva su id. order y
+# order_item son AUTOINCREMENT para que SQLite no vuelva a dar los ids más
+# altos tras archivarlos. Las lecturas de pedidos buscan primero en las
+# tablas en uso y después en el archivo.
+
+ARCHIVABLE_STATUSES = (COMPLETED, CANCELLED)
+ORDER_COLUMNS = ('id', 'user_id', 'created_at', 'status', 'deleted_at')
+ITEM_COLUMNS = ('id', 'order_id', 'game_id', 'quantity', 'unit_price')
+
+archive_cli = AppGroup('archive', help='Archivado de pedidos antiguos')
+
+_orders = Order.__table__
+_items = OrderItem.__table__
+
+
+#########################################################
+#                                                       #
+#                       LECTURAS                        #
+#                                                       #
+#########################################################
+
+def live_order(order_id):
+    return Order.query.filter(Order.id == order_id, Order.deleted_at.is_(None)).first()
+
+
+def archived_order(order_id):
+    return ArchivedOrder.query.filter(ArchivedOrder.id == order_id, ArchivedOrder.deleted_at.is_(None)).first()
+
+
+def find_order(order_id):
+    # Pedido con sus líneas y juegos, en uso o archivado; los borrados no se ven
+    order = Order.query.options(
+        selectinload(Order.items).selectinload(OrderItem.game)
+    ).filter(Order.id == order_id, Order.deleted_at.is_(None)).first()
+    if order is not None:
+        return order
+    return ArchivedOrder.query.options(
+        selectinload(ArchivedOrder.items).selectinload(ArchivedOrderItem.game)
+    ).filter(ArchivedOrder.id == order_id, ArchivedOrder.deleted_at.is_(None)).first()
+
+
+def _history_query(model, item_model, user_id, status, after, limit, newer_than=None):
+    query = model.query.filter(model.user_id == user_id, model.deleted_at.is_(None))
+    if status is not None:
+        query = query.filter(model.status == status)
+    if after:
+        query = query.filter(db.tuple_(model.created_at, model.id) < after)
+    if newer_than:
+        query = query.filter(db.tuple_(model.created_at, model.id) > newer_than)
+    return query.options(
+        selectinload(model.items).selectinload(item_model.game)
+    ).order_by(model.created_at.desc(), model.id.desc()).limit(limit).all()
+
+
+def user_orders_page(user_id, limit, after=None, status=None):
+    # Historial de más reciente a más antiguo mezclando pedidos en uso y
+    # archivados. Devuelve hasta limit + 1 pedidos (el extra indica que hay
+    # más páginas). Si la página se llena con pedidos en uso, en el archivo
+    # solo se buscan los posteriores al último de ellos, que casi nunca hay.
+    orders = _history_query(Order, OrderItem, user_id, status, after, limit + 1)
+    newer_than = (orders[-1].created_at, orders[-1].id) if len(orders) > limit else None
+    orders += _history_query(ArchivedOrder, ArchivedOrderItem, user_id, status, after, limit + 1, newer_than)
+    orders.sort(key=lambda order: (order.created_at, order.id), reverse=True)
+    return orders[:limit + 1]
+
+
+#########################################################
+#                                                       #
+#                      ARCHIVADO                        #
+#                                                       #
+#########################################################
+
+def archivable(cutoff):
+    return db.and_(
+        Order.created_at < cutoff,
+        db.or_(Order.status.in_(ARCHIVABLE_STATUSES), Order.deleted_at.isnot(None))
+    )
+
+
+def archive_batch(cutoff, batch_size):
+    # Mueve hasta batch_size pedidos con sus líneas en una transacción y
+    # devuelve cuántos ha movido
+    ids = [row[0] for row in db.session.query(Order.id).filter(archivable(cutoff)).order_by(Order.id).limit(batch_size)]
+    if not ids:
+        return 0
+    try:
+        db.session.execute(
+            db.insert(ArchivedOrder).from_select(
+                ORDER_COLUMNS + ('archived_at',),
+                db.select(*[_orders.c[name] for name in ORDER_COLUMNS], db.literal(datetime.utcnow(), db.DateTime))
+                .where(_orders.c.id.in_(ids), archivable(cutoff))
+            )
+        )
+        # Solo los que se han copiado: alguno pudo cambiar desde la lectura de ids
+        moved = db.select(ArchivedOrder.id).where(ArchivedOrder.id.in_(ids))
+        db.session.execute(
+            db.insert(ArchivedOrderItem).from_select(
+                ITEM_COLUMNS,
+                db.select(*[_items.c[name] for name in ITEM_COLUMNS]).where(_items.c.order_id.in_(moved))
+            )
+        )
+        db.session.execute(db.delete(OrderItem).where(OrderItem.order_id.in_(moved)).execution_options(synchronize_session=False))
+        result = db.session.execute(db.delete(Order).where(Order.id.in_(moved)).execution_options(synchronize_session=False))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return result.rowcount
+
+
+def archive_orders(cutoff, batch_size, pause=0.0, progress=None):
+    # Una pasada completa por lotes; la pausa entre lotes deja escribir a las
+    # peticiones (SQLite admite un solo escritor)
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        total += moved
+        if progress and moved:
+            progress(total)
+        if moved < batch_size:
+            return total
+        if pause:
+            time.sleep(pause)
+
+
+def default_cutoff(days=None):
+    days = current_app.config['ARCHIVE_AFTER_DAYS'] if days is None else days
+    return datetime.utcnow() - timedelta(days=days)
+
+
+@archive_cli.command('run')
+@click.option('--days', type=int, help='Antigüedad mínima en días (por defecto ARCHIVE_AFTER_DAYS)')
+@click.option('--batch-size', type=int, help='Pedidos por transacción (por defecto ARCHIVE_BATCH_SIZE)')
+@click.option('--every', type=float, help='Repite la pasada cada N segundos hasta Ctrl+C')
+def run_command(days, batch_size, every):
+    """Mueve los pedidos terminados antiguos al archivo."""
+    config = current_app.config
+    batch_size = batch_size or config['ARCHIVE_BATCH_SIZE']
+    try:
+        while True:
+            total = archive_orders(
+                default_cutoff(days), batch_size, config['ARCHIVE_BATCH_PAUSE'],
+                progress=lambda n: click.echo(f"{n} pedidos archivados")
+            )
+            click.echo(f"Pasada terminada: {total} pedidos archivados")
+            if not every:
+                break
+            time.sleep(every)
+    except KeyboardInterrupt:
+        click.echo("Archivado interrumpido; los lotes confirmados se conservan")
+
+
+@archive_cli.command('status')
+@click.option('--days', type=int, help='Antigüedad mínima en días (por defecto ARCHIVE_AFTER_DAYS)')
+def status_command(days):
+    """Pedidos en uso, archivados y pendientes de archivar."""
+    click.echo(f"{'en uso':<14} {db.session.query(db.func.count(Order.id)).scalar()}")
+    click.echo(f"{'archivados':<14} {db.session.query(db.func.count(ArchivedOrder.id)).scalar()}")
+    pending = db.session.query(db.func.count(Order.id)).filter(archivable(default_cutoff(days))).scalar()
+    click.echo(f"{'por archivar':<14} {pending}")
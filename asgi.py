@@ -0,0 +1,13 @@
+"""Modo ASGI, para servidores como uvicorn o hypercorn:
+
+    uvicorn asgi:app
+
+Flask es WSGI: cada petición se ejecuta en el pool de hilos del adaptador.
+Un solo worker mientras la caché, las revocaciones y el limitador sean
+locales al proceso (ver wsgi.process_local_state).
+"""
+from asgiref.wsgi import WsgiToAsgi
+
+from wsgi import app as wsgi_app
+
+app = WsgiToAsgi(wsgi_app)
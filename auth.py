@@ -0,0 +1,86 @@
+import time
+from datetime import timedelta
+from functools import wraps
+
+from flask import jsonify
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
+
+from cache import LocalCache
+
+# Las comprobaciones de rol y propiedad usan solo los claims firmados del
+# token, sin consultar la BD. Para no confiar en un token tras un cambio de
+# contraseña o de rol, o tras borrar al usuario, se guarda el momento de la
+# revocación durante lo que dura un token; los tokens emitidos antes se rechazan.
+# Las dos marcas de tiempo van en nanosegundos (claim ISSUED_AT_CLAIM): con el
+# iat estándar, en segundos enteros, un token emitido en el mismo segundo que
+# la revocación seguiría valiendo.
+revocations = LocalCache(max_entries=100000, ttl=None)
+ISSUED_AT_CLAIM = 'iat_ns'
+
+
+def init_auth(app, jwt):
+    expires = app.config.get('JWT_ACCESS_TOKEN_EXPIRES', timedelta(minutes=15))
+    revocations.ttl = int(expires.total_seconds()) if expires else None
+
+    @jwt.additional_claims_loader
+    def add_issued_at(identity):
+        return {ISSUED_AT_CLAIM: time.time_ns()}
+
+    @jwt.token_in_blocklist_loader
+    def check_revoked(jwt_header, jwt_payload):
+        revoked_at = revocations.get(f"revoked:{jwt_payload['sub']}")
+        if revoked_at is None:
+            return False
+        # Tokens sin el claim (emitidos antes de añadirlo): su iat está
+        # truncado, así que se revocan también los del mismo segundo
+        issued_at = jwt_payload.get(ISSUED_AT_CLAIM, jwt_payload['iat'] * 10 ** 9)
+        return issued_at <= revoked_at
+
+    @jwt.revoked_token_loader
+    def revoked_response(jwt_header, jwt_payload):
+        return jsonify({"msg": "Token revocado, vuelve a iniciar sesión"}), 401
+
+
+def revoke_user_tokens(user_id):
+    revocations.set(f"revoked:{user_id}", time.time_ns())
+
+
+def current_user_id():
+    return int(get_jwt_identity())
+
+
+def current_is_admin():
+    return bool(get_jwt().get("is_admin", False))
+
+
+def can_access(user_id):
+    return current_is_admin() or current_user_id() == user_id
+
+
+def forbidden():
+    return jsonify({"msg": "No autorizado"}), 403
+
+
+def admin_required():
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            verify_jwt_in_request()
+            if not current_is_admin():
+                return forbidden()
+            return fn(*args, **kwargs)
+        return decorator
+    return wrapper
+
+
+def owner_or_admin(arg='user_id'):
+    # El recurso pertenece al usuario indicado en el parámetro de la ruta
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            verify_jwt_in_request()
+            if not can_access(kwargs[arg]):
+                return forbidden()
+            return fn(*args, **kwargs)
+        return decorator
+    return wrapper
@@ -0,0 +1,75 @@
+"""Consultas y tiempo por petición de la comprobación de rol.
+
+Compara la comprobación antigua de delete_user (cargar el usuario del token
+para leer is_admin) con el decorador auth.admin_required, que solo mira los
+claims firmados del JWT.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/bench_auth.py [peticiones]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask, jsonify
+from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity, jwt_required
+from sqlalchemy import event
+
+from auth import admin_required, init_auth
+from models import db, User
+
+
+def build_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['JWT_SECRET_KEY'] = 'bench'
+    db.init_app(app)
+    jwt = JWTManager(app)
+    init_auth(app, jwt)
+
+    @app.route('/antes')
+    @jwt_required()
+    def before():
+        current_user = db.session.get(User, int(get_jwt_identity()))
+        if not current_user or not current_user.is_admin:
+            return jsonify({"msg": "No autorizado"}), 403
+        return jsonify({"ok": True})
+
+    @app.route('/despues')
+    @admin_required()
+    def after():
+        return jsonify({"ok": True})
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='admin', email='admin@example.com', password='x', is_admin=True))
+        db.session.commit()
+        token = create_access_token(identity="1", additional_claims={"is_admin": True})
+    return app, token
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    app, token = build_app()
+    headers = {"Authorization": f"Bearer {token}"}
+    client = app.test_client()
+
+    statements = [0]
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.__setitem__(0, statements[0] + 1))
+
+    for path in ('/antes', '/despues'):
+        statements[0] = 0
+        start = time.perf_counter()
+        for _ in range(requests):
+            assert client.get(path, headers=headers).status_code == 200
+        elapsed = time.perf_counter() - start
+        print(f"{path:<10} {statements[0] / requests:5.2f} consultas/petición  "
+              f"{elapsed / requests * 1e6:8.1f} µs/petición")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Escrituras concurrentes de pedidos bajo distintos modos de SQLite.
+
+Para cada combinación de journal_mode / synchronous se crea una BD temporal
+configurada con config.load_config, y varios hilos escritores crean pedidos
+(con reserva de stock) mientras otros hilos leen el catálogo.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/bench_db_modes.py [escritores] [lectores] [segundos]
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+from config import load_config
+from models import db, User, Game, Order, OrderItem
+from stock import OrderError, reserve_stock, with_stock_retry
+
+MODES = [
+    ('DELETE', 'FULL'),
+    ('WAL', 'FULL'),
+    ('WAL', 'NORMAL'),
+]
+GAMES = 100
+
+
+def build_app(path, journal_mode, synchronous):
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    os.environ['SQLITE_JOURNAL_MODE'] = journal_mode
+    os.environ['SQLITE_SYNCHRONOUS'] = synchronous
+    app = Flask(__name__)
+    load_config(app)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='bench', email='bench@example.com', password='x'))
+        db.session.add_all([Game(title=f'Juego {i}', price=10, stock=10 ** 6) for i in range(GAMES)])
+        db.session.commit()
+    return app
+
+
+def writer(app, deadline, counters):
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            quantities = {random.randint(1, GAMES): 1 for _ in range(3)}
+
+            def write():
+                order = Order(user_id=1)
+                db.session.add(order)
+                db.session.flush()
+                reserve_stock(quantities)
+                db.session.execute(db.insert(OrderItem), [
+                    {"order_id": order.id, "game_id": game_id, "quantity": quantity}
+                    for game_id, quantity in quantities.items()
+                ])
+                db.session.commit()
+
+            try:
+                with_stock_retry(write)
+                counters['pedidos'] += 1
+            except (OrderError, Exception):
+                db.session.rollback()
+                counters['errores'] += 1
+
+
+def reader(app, deadline, counters):
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            db.session.query(Game.id, Game.stock).filter(Game.id > random.randint(0, GAMES)).limit(20).all()
+            db.session.rollback()
+            counters['lecturas'] += 1
+
+
+def run(journal_mode, synchronous, writers, readers, seconds):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        app = build_app(path, journal_mode, synchronous)
+        counters = {'pedidos': 0, 'errores': 0, 'lecturas': 0}
+        deadline = time.perf_counter() + seconds
+        threads = [threading.Thread(target=writer, args=(app, deadline, counters)) for _ in range(writers)]
+        threads += [threading.Thread(target=reader, args=(app, deadline, counters)) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with app.app_context():
+            db.engine.dispose()
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    return counters
+
+
+def main():
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    print(f"{writers} escritores, {readers} lectores, {seconds:.0f}s por modo")
+    for journal_mode, synchronous in MODES:
+        counters = run(journal_mode, synchronous, writers, readers, seconds)
+        print(f"journal={journal_mode:<6} synchronous={synchronous:<6} "
+              f"{counters['pedidos'] / seconds:8.1f} pedidos/s  "
+              f"{counters['lecturas'] / seconds:8.1f} lecturas/s  "
+              f"errores={counters['errores']}")
+
+
+if __name__ == '__main__':
+    main()
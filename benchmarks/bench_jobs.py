@@ -0,0 +1,79 @@
+"""Rendimiento de la cola de trabajos con distintos números de workers.
+
+Encola M trabajos en una BD SQLite temporal y mide cuántos por segundo
+procesa un WorkerPool de N hilos. La tarea de prueba hace una escritura
+pequeña, como las tareas reales, para que cuente la contención de SQLite.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/bench_jobs.py [trabajos] [workers,...] [lote]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+from config import load_config
+from models import db, Game, Job
+import jobs
+
+
+@jobs.task('bench.touch')
+def touch(payload):
+    db.session.execute(
+        db.update(Game).where(Game.id == payload["game_id"]).values(stock=Game.stock + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def run(total, workers, batch_size):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    app = Flask(__name__)
+    load_config(app)
+    db.init_app(app)
+    try:
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([Game(title=f'Juego {i}', price=10, stock=0) for i in range(100)])
+            jobs.enqueue_many([('bench.touch', {"game_id": i % 100 + 1}, f'bench:{i}') for i in range(total)])
+            db.session.commit()
+
+        pool = jobs.WorkerPool(app, workers=workers, batch_size=batch_size, poll_interval=0.01)
+        start = time.perf_counter()
+        pool.start()
+        with app.app_context():
+            while db.session.query(Job.id).filter(Job.status != jobs.DONE).first() is not None:
+                db.session.rollback()
+                time.sleep(0.02)
+        elapsed = time.perf_counter() - start
+        pool.stop()
+        with app.app_context():
+            stock = db.session.query(db.func.sum(Game.stock)).scalar()
+            db.engine.dispose()
+        return elapsed, stock
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    workers_list = [int(n) for n in sys.argv[2].split(',')] if len(sys.argv) > 2 else [1, 2, 4, 8]
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    print(f"{total} trabajos, lotes de {batch_size}")
+    for workers in workers_list:
+        elapsed, stock = run(total, workers, batch_size)
+        status = "ok" if stock == total else f"ERROR: {stock} ejecuciones"
+        print(f"workers={workers:<3} {total / elapsed:9.1f} trabajos/s  ({elapsed:.2f}s, {status})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Throughput de verificación de contraseñas (el coste dominante de login).
+
+Compara la verificación en línea (PASSWORD_HASH_WORKERS = 0) con el pool de
+procesos de passwords.PasswordHasher, con tantos hilos concurrentes como
+núcleos, y muestra logins por segundo y por núcleo.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/bench_login.py [coste_bcrypt] [logins]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+from passwords import PasswordHasher
+
+
+def run(workers, cost, logins, threads):
+    app = Flask(__name__)
+    app.config['PASSWORD_HASH_ALGORITHM'] = 'bcrypt'
+    app.config['PASSWORD_HASH_COST'] = cost
+    app.config['PASSWORD_HASH_WORKERS'] = workers
+    hasher = PasswordHasher(app)
+    hashed = hasher.hash('contraseña-de-prueba')
+    # Calentamiento: arranca los procesos del pool antes de medir
+    for _ in range(max(workers, 1)):
+        hasher.verify(hashed, 'contraseña-de-prueba')
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(
+            lambda _: hasher.verify(hashed, 'contraseña-de-prueba'), range(logins)
+        ))
+    elapsed = time.perf_counter() - start
+    hasher.shutdown()
+    assert all(results)
+    return logins / elapsed
+
+
+def main():
+    cost = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    logins = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    cores = os.cpu_count() or 1
+
+    print(f"bcrypt coste={cost}, {logins} logins, {cores} núcleos")
+    for name, workers in (("en línea", 0), ("pool de procesos", cores)):
+        rate = run(workers, cost, logins, threads=cores)
+        print(f"{name:<18} {rate:8.1f} logins/s  {rate / cores:8.1f} logins/s/núcleo")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Coste del limitador de peticiones.
+
+Mide el tiempo de LocalRateLimitStore.consume (uno y varios hilos con claves
+distintas) y el sobrecoste por petición del limitador completo (límite por
+IP, límite de la ruta y descarte de carga) sobre una ruta vacía.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/bench_ratelimit.py [peticiones] [hilos]
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask, jsonify
+
+from ratelimit import RateLimiter, LocalRateLimitStore, priority, HIGH
+
+
+def bench_store(operations, threads):
+    store = LocalRateLimitStore()
+
+    def run(offset):
+        for i in range(operations):
+            store.consume(f"ip:10.0.{offset}.{i % 250}", 10 ** 9, 60)
+
+    workers = [threading.Thread(target=run, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    return elapsed / (operations * threads) * 1e9
+
+
+def build_app(enabled):
+    app = Flask(__name__)
+    app.config.update(
+        RATELIMIT_ENABLED=enabled,
+        RATELIMIT_DEFAULT='1000000000/60',
+        RATELIMIT_ROUTE='1000000000/60',
+        SHED_MAX_IN_FLIGHT=64,
+        SHED_LATENCY_MS=1000,
+    )
+    limiter = RateLimiter()
+    limiter.init_app(app)
+
+    @app.route('/ping')
+    @priority(HIGH)
+    @limiter.limit('RATELIMIT_ROUTE')
+    def ping():
+        return jsonify({"ok": True})
+
+    return app
+
+
+def bench_requests(requests, rounds=7):
+    # Rondas alternas con y sin limitador; se queda el mejor tiempo de cada uno
+    clients = {enabled: build_app(enabled).test_client() for enabled in (False, True)}
+    best = {}
+    for _ in range(rounds):
+        for enabled, client in clients.items():
+            start = time.perf_counter()
+            for _ in range(requests):
+                client.get('/ping')
+            elapsed = (time.perf_counter() - start) / requests * 1e6
+            best[enabled] = min(best.get(enabled, elapsed), elapsed)
+    return best[False], best[True]
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    print(f"consume, 1 hilo:       {bench_store(200000, 1):8.0f} ns/op")
+    print(f"consume, {threads} hilos:      {bench_store(200000 // threads, threads):8.0f} ns/op (total)")
+    without, with_limiter = bench_requests(requests)
+    print(f"petición sin limitador: {without:7.1f} us")
+    print(f"petición con limitador: {with_limiter:7.1f} us  (+{with_limiter - without:.1f} us)")
+
+
+if __name__ == '__main__':
+    main()
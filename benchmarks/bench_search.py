@@ -0,0 +1,119 @@
+"""Latencia de búsqueda sobre un catálogo sintético grande.
+
+Genera N juegos en una BD SQLite temporal y mide p50/p95/p99 de búsquedas
+con prefijo usando FTS5, el índice invertido en Python y, como referencia,
+un LIKE '%term%' sobre la tabla game.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/bench_search.py [juegos] [consultas]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+from config import load_config
+from models import db, Game
+from search import FTS5Backend, InvertedIndexBackend, tokenize
+
+WORDS = (
+    "legend zelda mario kart super galaxy dark souls final fantasy dragon quest "
+    "metal gear solid street fighter mortal kombat resident evil silent hill "
+    "halo gears war forza horizon tomb raider uncharted last guardians monster "
+    "hunter pokemon crystal sapphire emerald racing racer kingdom hearts tales "
+    "chrono trigger cross castlevania metroid prime fusion donkey country tropical "
+    "freeze sonic hedgehog adventure crash bandicoot spyro reignited trilogy"
+).split()
+# Vocabulario sintético adicional para que la selectividad se parezca a un catálogo real
+SYLLABLES = "ka ri to mon zel dra gor vel shi nex tor lum qua bre fin sol".split()
+WORDS += sorted({a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES})
+CHUNK = 10000
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def generate(total):
+    for start in range(0, total, CHUNK):
+        yield [
+            {
+                "title": " ".join(random.choices(WORDS, k=random.randint(2, 5))) + f" {i}",
+                "description": " ".join(random.choices(WORDS, k=random.randint(5, 15))),
+                "price": round(random.uniform(5, 70), 2),
+                "stock": random.randint(0, 100),
+                "version": 1
+            }
+            for i in range(start, min(start + CHUNK, total))
+        ]
+
+
+def measure(name, func, queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        func(query)
+        samples.append((time.perf_counter() - start) * 1000)
+    print(f"{name:<18} p50={percentile(samples, 0.50):8.2f}ms  "
+          f"p95={percentile(samples, 0.95):8.2f}ms  p99={percentile(samples, 0.99):8.2f}ms")
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    app = Flask(__name__)
+    load_config(app)
+    db.init_app(app)
+
+    try:
+        with app.app_context():
+            db.create_all()
+            start = time.perf_counter()
+            for rows in generate(total):
+                db.session.execute(db.insert(Game), rows)
+            db.session.commit()
+            print(f"{total} juegos insertados en {time.perf_counter() - start:.1f}s")
+
+            start = time.perf_counter()
+            with db.engine.begin() as connection:
+                FTS5Backend.install(connection)
+            print(f"índice FTS5 construido en {time.perf_counter() - start:.1f}s")
+
+            memory = InvertedIndexBackend()
+            start = time.perf_counter()
+            memory.load()
+            print(f"índice en memoria construido en {time.perf_counter() - start:.1f}s")
+
+            # Consultas de 1-2 palabras, la última truncada como al teclear
+            queries = []
+            for _ in range(count):
+                words = random.sample(WORDS, random.randint(1, 2))
+                words[-1] = words[-1][:random.randint(2, len(words[-1]))]
+                queries.append(" ".join(words))
+
+            fts5 = FTS5Backend()
+            measure("fts5", lambda q: fts5.search(tokenize(q), 20, 0), queries)
+            measure("memoria", lambda q: memory.search(tokenize(q), 20, 0), queries)
+            measure("like (sin ranking)", lambda q: db.session.query(Game.id).filter(
+                Game.title.like(f"%{q}%") | Game.description.like(f"%{q}%")
+            ).limit(20).all(), queries[:max(1, count // 10)])
+            db.engine.dispose()
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Coste de serialización por respuesta: diccionarios a mano + proveedor JSON
+por defecto de Flask frente a los esquemas compilados + FastJSONProvider.
+Ambos producen el mismo documento; las líneas del pedido llevan su juego ya
+cargado, como en las rutas (selectinload).
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/bench_serialization.py [repeticiones]
+"""
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from models import Game, Order, OrderItem
+from schemas import FastJSONProvider, GameSchema, OrderSchema, get_schema
+
+
+def build_fixtures():
+    game = Game(id=1, title="The Legend of Zelda", description="Aventura " * 20, price=59.99, stock=12)
+    order = Order(id=1, user_id=1, created_at=datetime(2025, 8, 21, 8, 14, 57), status="pendiente")
+    order.items = [OrderItem(game_id=i, quantity=i % 3 + 1, unit_price=59.99, game=game) for i in range(1, 21)]
+    return game, order
+
+
+def by_hand_game(game):
+    return {
+        "id": game.id,
+        "title": game.title,
+        "description": game.description,
+        "price": game.price,
+        "stock": game.stock
+    }
+
+
+def by_hand_order(order):
+    return {
+        "id": order.id,
+        "user_id": order.user_id,
+        "created_at": order.created_at.isoformat(),
+        "status": order.status,
+        "items": [
+            {
+                "game_id": item.game_id,
+                "quantity": item.quantity,
+                "unit_price": item.unit_price,
+                "game": {"title": item.game.title, "price": item.game.price}
+            }
+            for item in order.items
+        ]
+    }
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    app = Flask(__name__)
+    default_json = DefaultJSONProvider(app)
+    fast_json = FastJSONProvider(app)
+    game, order = build_fixtures()
+    game_schema = get_schema(GameSchema)
+    order_schema = get_schema(OrderSchema)
+    assert order_schema.dump(order) == by_hand_order(order)
+
+    cases = [
+        ("game  / a mano + json", lambda: default_json.dumps(by_hand_game(game))),
+        ("game  / a mano + fast", lambda: fast_json.dumps(by_hand_game(game))),
+        ("game  / esquema + fast", lambda: fast_json.dumps(game_schema.dump(game))),
+        ("order / a mano + json", lambda: default_json.dumps(by_hand_order(order))),
+        ("order / a mano + fast", lambda: fast_json.dumps(by_hand_order(order))),
+        ("order / esquema + fast", lambda: fast_json.dumps(order_schema.dump(order))),
+    ]
+    for name, func in cases:
+        elapsed = min(timeit.repeat(func, number=number, repeat=3))
+        print(f"{name:<26} {elapsed / number * 1e6:8.2f} µs/respuesta")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Comprobación del archivado de pedidos (archive.py) contra la API.
+
+Crea pedidos, los completa y los archiva todos, incluido el más reciente, y
+después crea uno nuevo. El pedido nuevo no puede reutilizar el id de uno
+archivado: el historial del usuario tendría dos pedidos con el mismo id, la
+siguiente pasada de archivado fallaría por la clave primaria de
+archived_order y el pedido nuevo se quedaría sin trabajo de recibo (las
+claves de la cola llevan el id del pedido). Se comprueban las tres cosas.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/check_archive.py [pedidos]
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    os.environ['RATELIMIT_ENABLED'] = '0'
+    os.environ['PASSWORD_HASH_WORKERS'] = '0'
+
+    from flask_jwt_extended import create_access_token
+
+    import archive
+    from app import app
+    from models import db, User, Game, Job
+
+    checks = []
+
+    def check(name, ok):
+        checks.append(ok)
+        print(f"{name}: {'OK' if ok else 'FALLO'}")
+
+    def archive_all():
+        try:
+            return archive.archive_orders(datetime.utcnow() + timedelta(seconds=1), 100)
+        except Exception as e:
+            print(f"archivado: {e.__class__.__name__}: {e}")
+            return None
+
+    try:
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(username='archivo', email='archivo@example.com', password='x'))
+            db.session.add(Game(title='Juego', price=10, stock=100))
+            db.session.commit()
+            headers = {"Authorization": "Bearer " + create_access_token(identity='1', additional_claims={"is_admin": True})}
+
+        client = app.test_client()
+
+        def place_order():
+            response = client.post('/api/orders', headers=headers, json={"user_id": 1, "items": [{"game_id": 1, "quantity": 1}]})
+            return response.get_json()["order_id"]
+
+        def complete(order_id):
+            client.put(f'/api/orders/{order_id}', headers=headers, json={"status": "completado"})
+
+        ids = [place_order() for _ in range(orders)]
+        for order_id in ids:
+            complete(order_id)
+        with app.app_context():
+            print(f"archivados: {archive_all()}")
+
+        new_id = place_order()
+        print(f"pedidos archivados {ids}, pedido nuevo {new_id}")
+        check("id nuevo por encima del archivo", new_id > max(ids))
+
+        history = client.get('/api/orders/user/1?limit=100', headers=headers).get_json()["orders"]
+        history_ids = [order["id"] for order in history]
+        check("historial sin ids repetidos", len(history_ids) == len(set(history_ids)) == orders + 1)
+
+        with app.app_context():
+            receipts = db.session.query(db.func.count(Job.id)).filter(Job.name == 'order.receipt').scalar()
+        check("recibo del pedido nuevo encolado", receipts == orders + 1)
+
+        complete(new_id)
+        with app.app_context():
+            check("segunda pasada de archivado", archive_all() == 1)
+            db.engine.dispose()
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    sys.exit(0 if all(checks) else 1)
+
+
+if __name__ == '__main__':
+    main()
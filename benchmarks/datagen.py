@@ -0,0 +1,138 @@
+"""Generador de datos sintéticos para benchmarks.
+
+Llena una BD con usuarios, juegos y pedidos con líneas usando inserciones
+masivas a través de los modelos (db.insert(Model) con listas de filas, por
+lotes), y recalcula los agregados de ventas para que los informes cuadren.
+Con la misma semilla genera siempre los mismos datos.
+
+Se puede usar como módulo (generate, dentro de un contexto de aplicación) o
+desde la línea de comandos para preparar un fichero de BD:
+
+    python benchmarks/datagen.py ruta.db [--users N] [--games N] [--orders N]
+        [--max-items N] [--days N] [--seed N]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import Flask, current_app
+
+from config import load_config
+from models import db, User, Game, Order, OrderItem
+from passwords import DEFAULT_COSTS, PasswordHasher
+from stock import PENDING, COMPLETED, CANCELLED
+import reports
+
+PASSWORD = 'secreto'
+INSERT_BATCH_SIZE = 5000
+# Reparto de estados de los pedidos generados
+STATUS_WEIGHTS = ((PENDING, 60), (COMPLETED, 30), (CANCELLED, 10))
+
+WORDS = (
+    "legend zelda mario kart super galaxy dark souls final fantasy dragon quest "
+    "metal gear solid street fighter resident evil silent hill halo forza horizon "
+    "tomb raider pokemon crystal kingdom hearts chrono trigger metroid prime sonic"
+).split()
+
+
+def _insert(model, rows, batch_size):
+    # rows es un generador: en memoria solo vive un lote
+    batch = []
+    count = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(db.insert(model), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(model), batch)
+        count += len(batch)
+    return count
+
+
+def generate(users=50, games=2000, orders=5000, max_items=4, days=90, seed=1,
+             password=PASSWORD, batch_size=INSERT_BATCH_SIZE):
+    # Debe llamarse dentro de un contexto de aplicación con las tablas ya
+    # creadas; los ids empiezan en 1 (BD vacía). El usuario 1 es el admin.
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    # Un único hash, con el algoritmo y coste de la aplicación para que el
+    # login no lo regenere, calculado en línea (sin pool de procesos)
+    hasher = PasswordHasher()
+    hasher.algorithm = current_app.config.get('PASSWORD_HASH_ALGORITHM', hasher.algorithm)
+    hasher.cost = int(current_app.config.get('PASSWORD_HASH_COST', DEFAULT_COSTS[hasher.algorithm]))
+    hasher.workers = 0
+    hashed = hasher.hash(password)
+    now = datetime.utcnow()
+    statuses, weights = zip(*STATUS_WEIGHTS)
+    prices = [round(rng.uniform(5, 70), 2) for _ in range(games)]
+
+    counts = {
+        "users": _insert(User, (
+            {"username": f"user{i}", "email": f"user{i}@example.com", "password": hashed, "is_admin": i == 1}
+            for i in range(1, users + 1)
+        ), batch_size),
+        "games": _insert(Game, (
+            {
+                "title": " ".join(rng.sample(WORDS, 3)) + f" {i}",
+                "description": " ".join(rng.choices(WORDS, k=8)),
+                "price": prices[i - 1],
+                # Stock de sobra para que los pedidos del benchmark no se agoten
+                "stock": 10 ** 6,
+                "version": 1
+            }
+            for i in range(1, games + 1)
+        ), batch_size),
+        "orders": _insert(Order, (
+            {
+                "user_id": rng.randint(1, users),
+                "created_at": now - timedelta(seconds=rng.randint(0, days * 86400)),
+                "status": rng.choices(statuses, weights)[0]
+            }
+            for _ in range(orders)
+        ), batch_size),
+        "order_items": _insert(OrderItem, (
+            {"order_id": order_id, "game_id": game_id, "quantity": rng.randint(1, 3), "unit_price": prices[game_id - 1]}
+            for order_id in range(1, orders + 1)
+            for game_id in rng.sample(range(1, games + 1), rng.randint(1, min(max_items, games)))
+        ), batch_size),
+    }
+    db.session.commit()
+    reports.rebuild()
+    counts["seconds"] = round(time.perf_counter() - start, 2)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='fichero SQLite a crear (no debe existir)')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--games', type=int, default=2000)
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--max-items', type=int, default=4)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    if os.path.exists(args.path):
+        parser.error(f"{args.path} ya existe")
+
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(args.path)}'
+    app = Flask(__name__)
+    load_config(app)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        counts = generate(args.users, args.games, args.orders, args.max_items, args.days, args.seed)
+        db.engine.dispose()
+    print(json.dumps(counts))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,617 @@
+"""Prueba de carga reproducible contra todas las rutas de la API.
+
+Genera una BD SQLite temporal con datos sintéticos (datagen.py) y reproduce
+una mezcla ponderada de peticiones que recorre todas las rutas de app.py:
+lecturas del catálogo y de pedidos, altas, cambios de estado y borrados,
+importación/exportación, cargas masivas e informes. Cada destino parte de
+una copia idéntica de la BD:
+
+- client: en el mismo proceso con el cliente de pruebas de Flask (sin red
+  ni servidor; mide la aplicación)
+- waitress: wsgi.py en un subproceso
+- gunicorn: gunicorn.conf.py en un subproceso, con --workers procesos
+
+Por endpoint informa de peticiones por segundo, latencia p50/p90/p99,
+sentencias SQL por petición (de la cabecera Server-Timing; las respuestas
+en streaming no la llevan), códigos de respuesta y errores (5xx o fallo de
+conexión); por destino, la memoria residente del proceso que atiende. Con
+--output el resultado se guarda en JSON y con --compare se compara con un
+resultado anterior.
+
+El limitador de peticiones se desactiva: todos los clientes salen de la
+misma IP.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/loadtest.py [--server client|waitress|gunicorn ...]
+        [--workers N] [--threads N] [--clients N] [--duration S]
+        [--warmup S] [--hash-cost N] [--json] [--output F] [--compare F]
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import re
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import datagen
+
+SERVERS = ('client', 'waitress', 'gunicorn')
+SERVER_TIMING_SQL = re.compile(r'desc="(\d+) sql"')
+IMPORT_RECORDS = 100
+BULK_ORDERS = 20
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))] if samples else 0.0
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def seed(path, args):
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    from flask import Flask
+    from flask_jwt_extended import JWTManager, create_access_token
+
+    from config import load_config
+    from models import db
+
+    app = Flask(__name__)
+    load_config(app)
+    db.init_app(app)
+    JWTManager(app)
+    with app.app_context():
+        db.create_all()
+        counts = datagen.generate(args.users, args.games, args.orders, seed=args.seed)
+        tokens = {
+            user_id: create_access_token(identity=str(user_id), additional_claims={"is_admin": user_id == 1})
+            for user_id in range(1, args.users + 1)
+        }
+        db.engine.dispose()
+    return counts, tokens
+
+
+#########################################################
+#                                                       #
+#                       MEZCLA                          #
+#                                                       #
+#########################################################
+
+class Workload:
+    # Generadores de peticiones por endpoint (nombre de la vista en app.py).
+    # Las escrituras que necesitan un recurso propio (actualizar o borrar un
+    # pedido, borrar un usuario o un juego) usan los creados durante la
+    # prueba; si aún no hay ninguno se elige otra petición.
+
+    def __init__(self, args, tokens):
+        self.games = args.games
+        self.users = args.users
+        self.orders = args.orders
+        self.tokens = tokens
+        self.pending_orders = deque()
+        self.finished_orders = deque()
+        self.new_users = deque()
+        self.new_games = deque()
+        self.registered = 0
+        self.lock = threading.Lock()
+        self.mix = [
+            ('get_game', 300, self.get_game),
+            ('list_games', 120, self.list_games),
+            ('get_order', 120, self.get_order),
+            ('search_games', 80, self.search_games),
+            ('create_order', 80, self.create_order),
+            ('get_user_orders', 60, self.get_user_orders),
+            ('update_order', 30, self.update_order),
+            ('get_user', 30, self.get_user),
+            ('report_game', 20, self.report_game),
+            ('update_user', 10, self.update_user),
+            ('update_game', 10, self.update_game),
+            ('delete_order', 10, self.delete_order),
+            ('report_top_games', 10, lambda rng: ('GET', '/api/reports/games/top', None, self.auth(1))),
+            ('report_daily', 10, lambda rng: ('GET', '/api/reports/daily', None, self.auth(1))),
+            ('report_summary', 10, lambda rng: ('GET', '/api/reports/summary', None, self.auth(1))),
+            ('register', 5, self.register),
+            ('login', 5, self.login),
+            ('delete_user', 5, self.delete_user),
+            ('create_game', 5, self.create_game),
+            ('delete_game', 5, self.delete_game),
+            ('cache_stats', 5, lambda rng: ('GET', '/api/cache/stats', None, self.auth(1))),
+            ('metrics', 5, lambda rng: ('GET', '/metrics', None, {})),
+            ('index', 5, lambda rng: ('GET', '/', None, {})),
+            ('import_games', 2, self.import_games),
+            ('create_orders_bulk', 2, self.create_orders_bulk),
+            ('export_games', 1, lambda rng: ('GET', '/api/games/export?format=csv', None, self.auth(1))),
+        ]
+
+    def auth(self, user_id):
+        return {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+    def customer(self, rng):
+        return rng.randint(2, self.users)
+
+    @staticmethod
+    def take(pool):
+        try:
+            return pool.popleft()
+        except IndexError:
+            return None
+
+    # Lecturas
+
+    def get_game(self, rng):
+        return 'GET', f'/api/games/{rng.randint(1, self.games)}', None, {}
+
+    def list_games(self, rng):
+        return 'GET', f'/api/games?limit=20&min_price={rng.randint(5, 60)}', None, {}
+
+    def search_games(self, rng):
+        return 'GET', f'/api/games/search?q={rng.choice(datagen.WORDS)[:4]}', None, {}
+
+    def get_order(self, rng):
+        return 'GET', f'/api/orders/{rng.randint(1, self.orders)}', None, self.auth(1)
+
+    def get_user_orders(self, rng):
+        user_id = self.customer(rng)
+        return 'GET', f'/api/orders/user/{user_id}?limit=20', None, self.auth(user_id)
+
+    def get_user(self, rng):
+        user_id = self.customer(rng)
+        return 'GET', f'/api/users/{user_id}', None, self.auth(user_id)
+
+    def report_game(self, rng):
+        return 'GET', f'/api/reports/games/{rng.randint(1, self.games)}', None, self.auth(1)
+
+    # Escrituras
+
+    def create_order(self, rng):
+        user_id = self.customer(rng)
+        items = [{"game_id": game_id, "quantity": 1} for game_id in rng.sample(range(1, self.games + 1), rng.randint(1, 3))]
+        headers = dict(self.auth(user_id), **{"Idempotency-Key": uuid.uuid4().hex})
+
+        def created(status, body):
+            if status == 201:
+                self.pending_orders.append((json.loads(body)["order_id"], user_id))
+        return 'POST', '/api/orders', {"user_id": user_id, "items": items}, headers, created
+
+    def update_order(self, rng):
+        order = self.take(self.pending_orders)
+        if order is None:
+            return None
+        order_id, user_id = order
+        self.finished_orders.append(order)
+        # El propietario cancela; el admin completa
+        if rng.random() < 0.5:
+            return 'PUT', f'/api/orders/{order_id}', {"status": "cancelado"}, self.auth(user_id)
+        return 'PUT', f'/api/orders/{order_id}', {"status": "completado"}, self.auth(1)
+
+    def delete_order(self, rng):
+        order = self.take(self.finished_orders) or self.take(self.pending_orders)
+        if order is None:
+            return None
+        order_id, user_id = order
+        return 'DELETE', f'/api/orders/{order_id}', None, self.auth(user_id)
+
+    def create_orders_bulk(self, rng):
+        lines = [
+            json.dumps({"user_id": self.customer(rng), "items": [{"game_id": rng.randint(1, self.games), "quantity": 1}]})
+            for _ in range(BULK_ORDERS)
+        ]
+        return 'POST', '/api/orders/bulk', "\n".join(lines), dict(self.auth(1), **{"Content-Type": "application/x-ndjson"})
+
+    def update_user(self, rng):
+        # Sin cambiar la contraseña: revocaría los tokens de la prueba
+        user_id = self.customer(rng)
+        email = f"user{user_id}.{uuid.uuid4().hex[:8]}@example.com"
+        return 'PUT', f'/api/users/{user_id}', {"email": email}, self.auth(user_id)
+
+    def register(self, rng):
+        name = f"bench_{uuid.uuid4().hex[:12]}"
+
+        def registered(status, body):
+            # El registro no devuelve el id; los usuarios de la prueba son los
+            # únicos con id mayor que los generados, así que se estima. Si el
+            # id ya no existe el borrado devuelve 404, que no es un error.
+            if status == 201:
+                with self.lock:
+                    self.registered += 1
+                    self.new_users.append(self.users + self.registered)
+        return 'POST', '/api/users/register', {"username": name, "email": f"{name}@example.com", "password": datagen.PASSWORD}, {}, registered
+
+    def login(self, rng):
+        user_id = self.customer(rng)
+        return 'POST', '/api/users/login', {"username": f"user{user_id}", "password": datagen.PASSWORD}, {}
+
+    def delete_user(self, rng):
+        user_id = self.take(self.new_users)
+        if user_id is None:
+            return None
+        return 'DELETE', f'/api/users/{user_id}', None, self.auth(1)
+
+    def create_game(self, rng):
+        def created(status, body):
+            if status == 201:
+                self.new_games.append(json.loads(body)["game"]["id"])
+        game = {"title": f"bench game {uuid.uuid4().hex[:8]}", "price": round(rng.uniform(5, 70), 2), "stock": 10}
+        return 'POST', '/api/games', game, self.auth(1), created
+
+    def update_game(self, rng):
+        game_id = rng.randint(1, self.games)
+        return 'PUT', f'/api/games/{game_id}', {"price": round(rng.uniform(5, 70), 2)}, self.auth(1)
+
+    def delete_game(self, rng):
+        game_id = self.take(self.new_games)
+        if game_id is None:
+            return None
+        return 'DELETE', f'/api/games/{game_id}', None, self.auth(1)
+
+    def import_games(self, rng):
+        # Mitad juegos nuevos y mitad ya importados (upsert)
+        lines = [
+            json.dumps({"title": f"bench import {rng.randint(1, IMPORT_RECORDS * 20)}", "price": round(rng.uniform(5, 70), 2), "stock": 100})
+            for _ in range(IMPORT_RECORDS)
+        ]
+        return 'POST', '/api/games/import', "\n".join(lines), dict(self.auth(1), **{"Content-Type": "application/x-ndjson"})
+
+    def next_request(self, rng, names, weights, makers, index=None):
+        while True:
+            if index is None:
+                index = rng.choices(range(len(names)), weights)[0]
+            call = makers[index](rng)
+            if call is not None:
+                return names[index], call
+            index = None
+
+
+#########################################################
+#                                                       #
+#                      EJECUCIÓN                        #
+#                                                       #
+#########################################################
+
+class HTTPTransport:
+    # Una conexión keep-alive por cliente contra el servidor real
+
+    def __init__(self, port):
+        self.port = port
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+
+    def request(self, method, path, data, headers):
+        try:
+            self.connection.request(method, path, body=data, headers=headers)
+            response = self.connection.getresponse()
+            return response.status, response.getheader('Server-Timing'), response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            return 0, None, b''
+
+    def close(self):
+        self.connection.close()
+
+
+class ClientTransport:
+    # Cliente de pruebas de Flask: la petición se atiende en el mismo hilo
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data, headers):
+        response = self.client.open(path, method=method, data=data, headers=headers)
+        body = response.get_data()
+        response.close()
+        return response.status_code, response.headers.get('Server-Timing'), body
+
+    def close(self):
+        pass
+
+
+def client(transport, workload, rng, sweep, warmup_end, deadline, results):
+    # sweep: endpoints que este cliente pide primero al empezar a medir, para
+    # que hasta los de menos peso tengan alguna muestra
+    names, weights, makers = zip(*workload.mix)
+    sweep = deque(sweep)
+    while True:
+        index = sweep.popleft() if sweep and time.perf_counter() >= warmup_end else None
+        name, call = workload.next_request(rng, names, weights, makers, index)
+        method, path, body, headers = call[:4]
+        callback = call[4] if len(call) > 4 else None
+        if isinstance(body, dict):
+            body = json.dumps(body)
+            headers = dict(headers, **{"Content-Type": "application/json"})
+        data = body.encode() if body is not None else None
+        start = time.perf_counter()
+        if start >= deadline:
+            break
+        status, server_timing, content = transport.request(method, path, data, headers)
+        elapsed = time.perf_counter() - start
+        if callback:
+            callback(status, content)
+        if start >= warmup_end:
+            match = SERVER_TIMING_SQL.search(server_timing or '')
+            results.append((name, elapsed, status, int(match.group(1)) if match else None))
+    transport.close()
+
+
+def run_clients(make_transport, workload, args):
+    results = []
+    warmup_end = time.perf_counter() + args.warmup
+    deadline = warmup_end + args.duration
+    threads = [
+        threading.Thread(
+            target=client,
+            args=(
+                make_transport(), workload, random.Random(args.seed + i),
+                range(i, len(workload.mix), args.clients), warmup_end, deadline, results
+            )
+        )
+        for i in range(args.clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def memory(pid):
+    # Memoria residente actual y máxima (MB) del proceso y sus hijos (los
+    # workers de gunicorn). Solo en Linux; en otros sistemas None.
+    pids = [pid]
+    for child in pids:
+        try:
+            with open(f'/proc/{child}/task/{child}/children') as f:
+                pids += [int(p) for p in f.read().split()]
+        except OSError:
+            pass
+    rss = peak = 0
+    for child in pids:
+        try:
+            with open(f'/proc/{child}/status') as f:
+                fields = dict(line.split(':', 1) for line in f if ':' in line)
+        except OSError:
+            if child == pid:
+                return None
+            continue
+        rss += int(fields['VmRSS'].split()[0])
+        peak += int(fields['VmHWM'].split()[0])
+    return {"processes": len(pids), "rss_mb": round(rss / 1024, 1), "peak_rss_mb": round(peak / 1024, 1)}
+
+
+def server_env(args, path, port):
+    env = dict(
+        os.environ,
+        DATABASE_URL=f'sqlite:///{path}',
+        WEB_BIND=f'127.0.0.1:{port}',
+        WEB_THREADS=str(args.threads),
+        WEB_WORKERS=str(args.workers),
+        WEB_MAX_REQUESTS='0',
+        RATELIMIT_ENABLED='0',
+    )
+    if args.hash_cost:
+        env['PASSWORD_HASH_COST'] = str(args.hash_cost)
+    return env
+
+
+def start_server(kind, env, port):
+    if kind == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+    else:
+        command = [sys.executable, 'wsgi.py']
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(process.stderr.read().decode())
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("El servidor no arrancó")
+
+
+def run_in_process(args, path, workload):
+    # La aplicación lee la configuración al importarse
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    os.environ['RATELIMIT_ENABLED'] = '0'
+    if args.hash_cost:
+        os.environ['PASSWORD_HASH_COST'] = str(args.hash_cost)
+    from app import app
+
+    # Las consultas lentas se siguen contando en /metrics; en la consola solo
+    # taparían la tabla de resultados
+    logging.getLogger('metrics').setLevel(logging.ERROR)
+    results = run_clients(lambda: ClientTransport(app), workload, args)
+    used = memory(os.getpid())
+    with app.app_context():
+        from models import db
+        db.engine.dispose()
+    return results, used, None, sorted(set(app.view_functions) - {'static'})
+
+
+def run_server(args, kind, path, workload):
+    port = free_port()
+    server = start_server(kind, server_env(args, path, port), port)
+    used = None
+    try:
+        results = run_clients(lambda: HTTPTransport(port), workload, args)
+        used = memory(server.pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        exit_code = server.wait(timeout=60)
+    return results, used, exit_code, None
+
+
+#########################################################
+#                                                       #
+#                      RESULTADOS                       #
+#                                                       #
+#########################################################
+
+def summarize(samples, duration):
+    latencies = [elapsed for _, elapsed, _, _ in samples]
+    statements = [sql for _, _, _, sql in samples if sql is not None]
+    statuses = {}
+    for _, _, status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / duration, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p90_ms": round(percentile(latencies, 0.90) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "sql_avg": round(sum(statements) / len(statements), 2) if statements else None,
+        "sql_max": max(statements) if statements else None,
+        "statuses": dict(sorted(statuses.items())),
+        "errors": sum(1 for _, _, status, _ in samples if status == 0 or status >= 500),
+    }
+
+
+def report(results, duration):
+    endpoints = {}
+    for name in sorted({name for name, _, _, _ in results}):
+        endpoints[name] = summarize([row for row in results if row[0] == name], duration)
+    endpoints["total"] = summarize(results, duration)
+    return endpoints
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_target(kind, args, target):
+    label = kind + (f" x{args.workers}" if kind == 'gunicorn' else '')
+    threads = f", {args.threads} hilos" if kind != 'client' else ''
+    print(f"{label}{threads}, {args.clients} clientes, {args.duration:.0f}s")
+    print(f"{'endpoint':<20}{'peticiones':>11}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'sql':>7}{'errores':>9}")
+    for name, row in target["endpoints"].items():
+        sql = row['sql_avg'] if row['sql_avg'] is not None else '-'
+        print(f"{name:<20}{row['requests']:>11}{row['rps']:>9}{row['p50_ms']:>9}{row['p99_ms']:>9}{sql:>7}{row['errors']:>9}")
+    if target["memory"]:
+        print(f"memoria: {target['memory']['rss_mb']} MB residentes, máximo {target['memory']['peak_rss_mb']} MB")
+    if target["server_exit_code"] is not None:
+        print(f"servidor terminado con código {target['server_exit_code']}")
+    print()
+
+
+def print_comparison(baseline, current):
+    # Variación relativa de req/s y p99 por destino y endpoint
+    print(f"Comparación con {baseline['meta'].get('git_revision')} ({baseline['meta']['timestamp']})")
+    print(f"{'destino':<10}{'endpoint':<20}{'req/s':>9}{'Δ':>8}{'p99 ms':>9}{'Δ':>8}")
+    for kind, target in current["targets"].items():
+        previous = baseline["targets"].get(kind)
+        if previous is None:
+            continue
+        for name, row in target["endpoints"].items():
+            old = previous["endpoints"].get(name)
+            if old is None:
+                continue
+            rps = f"{(row['rps'] / old['rps'] - 1) * 100:+.0f}%" if old['rps'] else '-'
+            p99 = f"{(row['p99_ms'] / old['p99_ms'] - 1) * 100:+.0f}%" if old['p99_ms'] else '-'
+            print(f"{kind:<10}{name:<20}{row['rps']:>9}{rps:>8}{row['p99_ms']:>9}{p99:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--server', choices=SERVERS, action='append', help='destino, repetible (client y waitress)')
+    parser.add_argument('--workers', type=int, default=1, help='procesos (solo gunicorn; más de 1 exige almacenes compartidos)')
+    parser.add_argument('--threads', type=int, default=8, help='hilos por proceso del servidor')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--warmup', type=float, default=1, help='segundos iniciales que no se miden')
+    parser.add_argument('--games', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--hash-cost', type=int, help='PASSWORD_HASH_COST (por defecto el de la configuración)')
+    parser.add_argument('--json', action='store_true', help='salida en JSON')
+    parser.add_argument('--output', help='guarda el resultado en este fichero JSON')
+    parser.add_argument('--compare', help='resultado JSON anterior con el que comparar')
+    args = parser.parse_args()
+    servers = args.server or ['client', 'waitress']
+    if 'client' in servers:
+        # El cliente en proceso va primero: importa la aplicación una vez
+        servers = ['client'] + [kind for kind in servers if kind != 'client']
+    if args.hash_cost:
+        os.environ['PASSWORD_HASH_COST'] = str(args.hash_cost)
+
+    workdir = tempfile.mkdtemp(prefix='loadtest-')
+    try:
+        base = os.path.join(workdir, 'base.db')
+        dataset, tokens = seed(base, args)
+        result = {
+            "meta": {
+                "timestamp": datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+                "git_revision": git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+            },
+            "config": dict(vars(args), server=servers),
+            "dataset": dataset,
+            "targets": {},
+        }
+        for kind in dict.fromkeys(servers):
+            path = os.path.join(workdir, f'{kind}.db')
+            shutil.copyfile(base, path)
+            workload = Workload(args, tokens)
+            if kind == 'client':
+                results, used, exit_code, routes = run_in_process(args, path, workload)
+                covered = {name for name, _, _ in workload.mix}
+                result["routes_not_covered"] = [route for route in routes if route not in covered]
+            else:
+                results, used, exit_code, _ = run_server(args, kind, path, workload)
+            result["targets"][kind] = {
+                "endpoints": report(results, args.duration),
+                "memory": used,
+                "server_exit_code": exit_code,
+            }
+
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=2)
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            for kind, target in result["targets"].items():
+                print_target(kind, args, target)
+            if result.get("routes_not_covered"):
+                print(f"Rutas sin cubrir: {', '.join(result['routes_not_covered'])}")
+        if args.compare:
+            with open(args.compare, encoding='utf-8') as f:
+                print_comparison(json.load(f), result)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
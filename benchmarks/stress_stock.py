@@ -0,0 +1,230 @@
+"""Prueba de estrés del motor de reservas de stock (stock.py).
+
+Muchos hilos compran a la vez las últimas unidades de unos pocos juegos.
+Al terminar se comprueba que no se ha vendido más de lo que había, que
+ningún stock es negativo y que las unidades reservadas coinciden con las
+líneas de pedido insertadas. Se cuentan los reintentos por StockConflict.
+
+En esa prueba, como en create_order, el INSERT del pedido va antes de la
+reserva: en SQLite toma el bloqueo de escritura antes de leer el stock, así
+que los escritores quedan serializados por la BD y casi nunca hay
+conflictos de versión. Por eso hay una segunda prueba que fuerza el
+entrelazado: dos hilos leen el stock (load_stock, fuera de transacción),
+uno reserva y confirma, y el otro hace su UPDATE con la versión ya leída.
+Ese UPDATE no toca ninguna fila, lanza StockConflict y with_stock_retry
+repite la unidad de trabajo con el stock nuevo. Se comprueba que cada ronda
+produce exactamente un reintento y ninguna sobreventa.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/stress_stock.py [hilos] [compras_por_hilo] [rondas_entrelazadas]
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+import stock
+from models import db, User, Game, Order, OrderItem
+from stock import OrderError, StockConflict, reserve_stock, with_stock_retry
+
+INITIAL_STOCK = 50
+GAMES = 3
+
+
+def build_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='stress', email='stress@example.com', password='x'))
+        for i in range(GAMES):
+            db.session.add(Game(title=f'Juego {i}', price=10, stock=INITIAL_STOCK))
+        db.session.commit()
+    return app
+
+
+def count(counters, lock, name):
+    with lock:
+        counters[name] = counters.get(name, 0) + 1
+
+
+def reserve_counting(quantities, counters, lock):
+    try:
+        reserve_stock(quantities)
+    except StockConflict:
+        count(counters, lock, 'reintentos')
+        raise
+
+
+def buyer(app, purchases, counters, lock):
+    for _ in range(purchases):
+        quantities = {random.randint(1, GAMES): random.randint(1, 3)}
+        if random.random() < 0.3:
+            quantities[random.randint(1, GAMES)] = 1
+
+        def write():
+            order = Order(user_id=1)
+            db.session.add(order)
+            db.session.flush()
+            reserve_counting(quantities, counters, lock)
+            db.session.execute(db.insert(OrderItem), [
+                {"order_id": order.id, "game_id": game_id, "quantity": quantity}
+                for game_id, quantity in quantities.items()
+            ])
+            db.session.commit()
+
+        with app.app_context():
+            try:
+                with_stock_retry(write)
+                outcome = 'ok'
+            except OrderError as e:
+                outcome = 'conflicto' if e.status == 409 else 'sin_stock'
+            except Exception:
+                db.session.rollback()
+                outcome = 'error'
+        count(counters, lock, outcome)
+
+
+def interleaved_round(app, game_id, counters, lock):
+    # Dos compradores del mismo juego. Ambos leen el stock; el primero
+    # reserva y confirma, y solo entonces el segundo sigue con su UPDATE,
+    # que lleva la versión anterior
+    read_both = threading.Barrier(2)
+    first_committed = threading.Event()
+    original_load = stock.load_stock
+    local = threading.local()
+
+    def gated_load(game_ids):
+        rows = original_load(game_ids)
+        if not getattr(local, 'gated', False):
+            local.gated = True
+            read_both.wait()
+            if local.second:
+                first_committed.wait()
+        return rows
+
+    def purchase(second):
+        local.second = second
+        quantities = {game_id: 1}
+
+        def write():
+            # Reserva antes del INSERT del pedido: la lectura del stock queda
+            # fuera de la transacción de escritura
+            reserve_counting(quantities, counters, lock)
+            order = Order(user_id=1)
+            db.session.add(order)
+            db.session.flush()
+            db.session.execute(db.insert(OrderItem), [
+                {"order_id": order.id, "game_id": game_id, "quantity": 1, "unit_price": 10}
+            ])
+            db.session.commit()
+
+        with app.app_context():
+            try:
+                with_stock_retry(write)
+                outcome = 'ok'
+            except OrderError as e:
+                outcome = 'conflicto' if e.status == 409 else 'sin_stock'
+            except Exception:
+                db.session.rollback()
+                outcome = 'error'
+            finally:
+                if not second:
+                    first_committed.set()
+        count(counters, lock, outcome)
+
+    stock.load_stock = gated_load
+    try:
+        buyers = [threading.Thread(target=purchase, args=(second,)) for second in (False, True)]
+        for thread in buyers:
+            thread.start()
+        for thread in buyers:
+            thread.join()
+    finally:
+        stock.load_stock = original_load
+
+
+def check(app):
+    with app.app_context():
+        current = dict(db.session.query(Game.id, Game.stock))
+        sold = dict(
+            db.session.query(OrderItem.game_id, db.func.sum(OrderItem.quantity))
+            .group_by(OrderItem.game_id)
+        )
+    ok = True
+    for game_id in sorted(current):
+        units = sold.get(game_id, 0)
+        consistent = current[game_id] >= 0 and units + current[game_id] == INITIAL_STOCK
+        ok = ok and consistent
+        print(f"juego {game_id}: vendidas={units} stock={current[game_id]} {'OK' if consistent else 'SOBREVENTA'}")
+    return ok
+
+
+def run(path, target):
+    app = build_app(path)
+    try:
+        start = time.perf_counter()
+        counters = target(app)
+        elapsed = time.perf_counter() - start
+        return app, counters, elapsed
+    finally:
+        with app.app_context():
+            db.session.remove()
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    purchases = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    ok = True
+
+    def contended(app):
+        counters = {'reintentos': 0}
+        lock = threading.Lock()
+        workers = [
+            threading.Thread(target=buyer, args=(app, purchases, counters, lock))
+            for _ in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return counters
+
+    def interleaved(app):
+        counters = {'reintentos': 0}
+        lock = threading.Lock()
+        for i in range(rounds):
+            interleaved_round(app, i % GAMES + 1, counters, lock)
+        return counters
+
+    for name, target in (("concurrencia", contended), ("entrelazado", interleaved)):
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        try:
+            app, counters, elapsed = run(path, target)
+            print(f"{name}: {counters} en {elapsed:.2f}s")
+            ok = check(app) and ok
+            with app.app_context():
+                db.engine.dispose()
+        finally:
+            os.remove(path)
+        if name == "entrelazado":
+            # Cada ronda: las dos compras salen adelante y exactamente una reintenta
+            retried = counters.get('reintentos', 0) == rounds and counters.get('ok', 0) == 2 * rounds
+            print(f"reintentos por ronda: {'OK' if retried else 'FALLO'}")
+            ok = ok and retried
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheBackend:
+    # Interfaz mínima para un backend de caché compartido (Redis, memcached...).
+    #
+    # Llenado tras un fallo sin guardar datos antiguos: el lector toma
+    # generation(key) antes de leer la BD y pasa ese valor a set(). Si entre
+    # medias se ha borrado la clave (una escritura la invalidó), set() no
+    # guarda nada y devuelve False. En Redis se implementa con un contador
+    # por clave (INCR en delete) comprobado en un script Lua al hacer el SET.
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def generation(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None, generation=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+class LocalCache(CacheBackend):
+    # Caché en proceso con expiración por TTL y expulsión LRU. ttl=None no
+    # caduca nunca; ttl=0 desactiva la caché (set no guarda nada).
+    #
+    # Las generaciones salen de un contador global que avanza en cada
+    # delete. La entrada de una clave recuerda la generación de su último
+    # borrado (si no había valor queda una marca sin valor, que cuenta para
+    # max_entries). Al expulsar o caducar una entrada su generación pasa a
+    # _floor, que se aplica a todas las claves sin entrada: puede rechazar
+    # algún llenado válido, nunca aceptar uno antiguo.
+
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # clave -> (valor, expires_at, generación del último delete)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._floor = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_sets = 0
+
+    def _drop(self, key):
+        # Llamar con el lock tomado
+        _, _, generation = self._data.pop(key)
+        self._floor = max(self._floor, generation)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] is None:
+                self.misses += 1
+                return None
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def generation(self, key):
+        with self._lock:
+            return self._generation
+
+    def set(self, key, value, ttl=None, generation=None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is not None and ttl <= 0:
+            return False
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            entry = self._data.get(key)
+            deleted_at = entry[2] if entry is not None else self._floor
+            if generation is not None and deleted_at > generation:
+                self.stale_sets += 1
+                return False
+            self._data[key] = (value, expires_at, deleted_at)
+            self._data.move_to_end(key)
+            self._evict()
+            return True
+
+    def _evict(self):
+        # Llamar con el lock tomado
+        while len(self._data) > self.max_entries:
+            key = next(iter(self._data))
+            self._drop(key)
+            self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._generation += 1
+            self._data[key] = (None, None, self._generation)
+            self._data.move_to_end(key)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+            self._floor = self._generation
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": sum(1 for value, _, _ in self._data.values() if value is not None),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "stale_sets": self.stale_sets
+            }
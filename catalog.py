@@ -0,0 +1,217 @@
+import csv
+import io
+import json
+import os
+
+import click
+from flask.cli import AppGroup
+
+from models import db, Game
+from search import game_search
+
+# Importación y exportación masiva del catálogo. Los juegos se identifican
+# por título: si ya existe se actualiza (precio, stock, descripción) y si no
+# se inserta. Cada lote es una transacción con un SELECT, un UPDATE
+# (executemany) y un INSERT masivo.
+
+IMPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FIELDS = ('id', 'title', 'description', 'price', 'stock')
+FORMATS = ('csv', 'ndjson')
+
+catalog_cli = AppGroup('catalog', help='Importación y exportación del catálogo')
+
+_games = Game.__table__
+# Los campos que faltan en el registro conservan su valor actual; la versión
+# se incrementa para invalidar reservas de stock en curso
+UPDATE_GAME = _games.update().where(_games.c.id == db.bindparam('_id')).values(
+    price=db.func.coalesce(db.bindparam('price', type_=db.Float), _games.c.price),
+    stock=db.func.coalesce(db.bindparam('stock', type_=db.Integer), _games.c.stock),
+    description=db.func.coalesce(db.bindparam('description', type_=db.Text), _games.c.description),
+    version=_games.c.version + 1
+)
+
+
+def detect_format(name):
+    # Por extensión de fichero o por Content-Type
+    name = (name or '').lower()
+    return 'csv' if name.endswith('.csv') or 'csv' in name else 'ndjson'
+
+
+def read_records(stream, fmt):
+    # Genera (línea, dict) sin cargar el fichero entero; None si la línea no es válida
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_no, raw in enumerate(stream, start=1):
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            yield line_no, json.loads(raw)
+        except ValueError:
+            yield line_no, None
+
+
+def _value(data, name, cast):
+    value = data.get(name)
+    if value is None or value == '':
+        return None
+    return cast(value)
+
+
+def clean_record(data):
+    if not isinstance(data, dict):
+        raise ValueError("Registro inválido")
+    title = (data.get('title') or '').strip()
+    if not title or len(title) > 100:
+        raise ValueError("title es obligatorio (máximo 100 caracteres)")
+    try:
+        price = _value(data, 'price', float)
+        stock = _value(data, 'stock', int)
+    except (TypeError, ValueError):
+        raise ValueError("price o stock inválidos")
+    if (price is not None and price < 0) or (stock is not None and stock < 0):
+        raise ValueError("price y stock no pueden ser negativos")
+    description = data.get('description')
+    return {
+        "title": title,
+        "price": price,
+        "stock": stock,
+        "description": description if description != '' else None
+    }
+
+
+def upsert_batch(records):
+    # records: lista de (línea, registro limpio). Si un título se repite en el
+    # lote gana la última aparición.
+    by_title = {}
+    for line_no, record in records:
+        by_title[record["title"]] = (line_no, record)
+    if not by_title:
+        return 0, [], []
+
+    existing = {}
+    for game_id, title in db.session.query(Game.id, Game.title).filter(
+        Game.title.in_(list(by_title))
+    ).order_by(Game.id):
+        existing.setdefault(title, game_id)
+
+    updates, inserts, errors = [], [], []
+    for title, (line_no, record) in by_title.items():
+        if title in existing:
+            updates.append({
+                "_id": existing[title],
+                "price": record["price"],
+                "stock": record["stock"],
+                "description": record["description"]
+            })
+        elif record["price"] is None:
+            errors.append({"line": line_no, "msg": "price es obligatorio para juegos nuevos"})
+        else:
+            inserts.append({
+                "title": title,
+                "description": record["description"] or '',
+                "price": record["price"],
+                "stock": record["stock"] or 0,
+                "version": 1
+            })
+
+    if updates:
+        db.session.execute(UPDATE_GAME, updates)
+    if inserts:
+        db.session.execute(db.insert(Game), inserts)
+    db.session.commit()
+    game_search.reindex(Game.title.in_(list(by_title)))
+    return len(inserts), [row["_id"] for row in updates], errors
+
+
+def import_games(records, batch_size=IMPORT_BATCH_SIZE, on_commit=None):
+    # Genera un resumen por lote; on_commit recibe los ids actualizados
+    processed = 0
+    batch, errors = [], []
+
+    def flush():
+        try:
+            inserted, updated, batch_errors = upsert_batch(batch)
+        except Exception:
+            db.session.rollback()
+            raise
+        if on_commit:
+            on_commit(updated)
+        return {
+            "processed": processed,
+            "inserted": inserted,
+            "updated": len(updated),
+            "errors": errors + batch_errors
+        }
+
+    for line_no, data in records:
+        processed += 1
+        try:
+            batch.append((line_no, clean_record(data)))
+        except ValueError as e:
+            errors.append({"line": line_no, "msg": str(e)})
+        if len(batch) >= batch_size:
+            yield flush()
+            batch, errors = [], []
+    if batch or errors:
+        yield flush()
+
+
+def export_games(fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    # Recorre el catálogo por keyset sobre id; cada bloque se emite como texto
+    columns = [getattr(Game, name) for name in EXPORT_FIELDS]
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(EXPORT_FIELDS)
+        yield buffer.getvalue()
+    last_id = 0
+    while True:
+        rows = db.session.query(*columns).filter(Game.id > last_id).order_by(Game.id).limit(chunk_size).all()
+        if not rows:
+            break
+        if fmt == 'csv':
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            yield buffer.getvalue()
+        else:
+            yield ''.join(json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + "\n" for row in rows)
+        last_id = rows[-1].id
+
+
+@catalog_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Por defecto según la extensión')
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True)
+def import_command(path, fmt, batch_size):
+    """Importa juegos desde un fichero CSV o NDJSON (upsert por título)."""
+    totals = {"processed": 0, "inserted": 0, "updated": 0, "errors": 0}
+    with open(path, encoding='utf-8', newline='') as stream:
+        for summary in import_games(read_records(stream, fmt or detect_format(path)), batch_size):
+            for error in summary["errors"]:
+                click.echo(f"línea {error['line']}: {error['msg']}", err=True)
+            totals["processed"] = summary["processed"]
+            totals["inserted"] += summary["inserted"]
+            totals["updated"] += summary["updated"]
+            totals["errors"] += len(summary["errors"])
+            click.echo(f"{totals['processed']} registros procesados")
+    click.echo(
+        f"Importación terminada: {totals['inserted']} insertados, "
+        f"{totals['updated']} actualizados, {totals['errors']} con errores"
+    )
+
+
+@catalog_cli.command('export')
+@click.argument('path', type=click.Path(dir_okay=False, writable=True), default='-')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Por defecto según la extensión')
+def export_command(path, fmt):
+    """Exporta el catálogo a CSV o NDJSON (por defecto a la salida estándar)."""
+    fmt = fmt or detect_format(path)
+    with click.open_file(path, 'w', encoding='utf-8') as output:
+        for chunk in export_games(fmt):
+            output.write(chunk)
+    if path != '-':
+        click.echo(f"Catálogo exportado a {os.path.abspath(path)}")
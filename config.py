@@ -0,0 +1,125 @@
+import os
+import sqlite3
+
+from dotenv import load_dotenv
+from flask import g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+# Pragmas aplicados a cada conexión SQLite nueva (ver load_config)
+SQLITE_PRAGMAS = {}
+
+REPLICA_BIND = 'replica'
+
+
+def env(name, default=None, cast=str):
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    if cast is bool:
+        return value.lower() in ('1', 'true', 'si', 'sí', 'yes')
+    return cast(value)
+
+
+def engine_options(url):
+    # Pool explícito y pre-ping para todos los motores salvo SQLite en memoria,
+    # que usa un pool propio de una sola conexión
+    url = make_url(url)
+    options = {'pool_pre_ping': True}
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return options
+    options.update(
+        pool_size=env('DB_POOL_SIZE', 5, int),
+        max_overflow=env('DB_MAX_OVERFLOW', 10, int),
+        pool_timeout=env('DB_POOL_TIMEOUT', 30, int),
+        pool_recycle=env('DB_POOL_RECYCLE', 1800, int),
+    )
+    return options
+
+
+def load_config(app):
+    # Configuración desde variables de entorno (y .env si existe); los valores
+    # por defecto reproducen la configuración original del proyecto
+    load_dotenv()
+
+    database_url = env('DATABASE_URL', 'sqlite:///database.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(database_url)
+
+    replica_url = env('DATABASE_REPLICA_URL')
+    if replica_url:
+        app.config['SQLALCHEMY_BINDS'] = {
+            REPLICA_BIND: {'url': replica_url, **engine_options(replica_url)}
+        }
+
+    app.config['JWT_SECRET_KEY'] = env('JWT_SECRET_KEY', 'david3010')
+    app.config['GAME_CACHE_TTL'] = env('GAME_CACHE_TTL', 60, int)
+    app.config['GAME_CACHE_SIZE'] = env('GAME_CACHE_SIZE', 1024, int)
+    app.config['PASSWORD_HASH_ALGORITHM'] = env('PASSWORD_HASH_ALGORITHM', 'bcrypt')
+    # Sin PASSWORD_HASH_COST, PasswordHasher usa el coste por defecto del algoritmo
+    if env('PASSWORD_HASH_COST') is not None:
+        app.config['PASSWORD_HASH_COST'] = env('PASSWORD_HASH_COST', cast=int)
+    if env('PASSWORD_HASH_WORKERS') is not None:
+        app.config['PASSWORD_HASH_WORKERS'] = env('PASSWORD_HASH_WORKERS', cast=int)
+
+    app.config['JOB_WORKERS'] = env('JOB_WORKERS', 4, int)
+    app.config['JOB_BATCH_SIZE'] = env('JOB_BATCH_SIZE', 20, int)
+    app.config['JOB_POLL_INTERVAL'] = env('JOB_POLL_INTERVAL', 1.0, float)
+    app.config['JOB_MAX_ATTEMPTS'] = env('JOB_MAX_ATTEMPTS', 5, int)
+    app.config['IDEMPOTENCY_TTL'] = env('IDEMPOTENCY_TTL', 86400, int)
+    app.config['ARCHIVE_AFTER_DAYS'] = env('ARCHIVE_AFTER_DAYS', 90, int)
+    app.config['ARCHIVE_BATCH_SIZE'] = env('ARCHIVE_BATCH_SIZE', 1000, int)
+    app.config['ARCHIVE_BATCH_PAUSE'] = env('ARCHIVE_BATCH_PAUSE', 0.1, float)
+    app.config['RATELIMIT_ENABLED'] = env('RATELIMIT_ENABLED', True, bool)
+    app.config['RATELIMIT_DEFAULT'] = env('RATELIMIT_DEFAULT', '600/60')
+    app.config['RATELIMIT_LOGIN'] = env('RATELIMIT_LOGIN', '10/60')
+    app.config['RATELIMIT_REGISTER'] = env('RATELIMIT_REGISTER', '5/60')
+    app.config['RATELIMIT_ORDERS'] = env('RATELIMIT_ORDERS', '60/60')
+    app.config['SHED_MAX_IN_FLIGHT'] = env('SHED_MAX_IN_FLIGHT', 64, int)
+    app.config['SHED_LATENCY_MS'] = env('SHED_LATENCY_MS', 1000, float)
+    app.config['METRICS_ENABLED'] = env('METRICS_ENABLED', True, bool)
+    app.config['METRICS_TOKEN'] = env('METRICS_TOKEN')
+    app.config['SLOW_QUERY_MS'] = env('SLOW_QUERY_MS', 200, float)
+
+    SQLITE_PRAGMAS.clear()
+    SQLITE_PRAGMAS.update({
+        'journal_mode': env('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': env('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': env('SQLITE_BUSY_TIMEOUT', 5000, int),
+        'mmap_size': env('SQLITE_MMAP_SIZE', 268435456, int),
+    })
+
+    @app.before_request
+    def route_reads_to_replica():
+        g.use_replica = request.method in ('GET', 'HEAD')
+
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        try:
+            cursor.execute(f"PRAGMA {name}={value}")
+        except sqlite3.DatabaseError:
+            # p. ej. journal_mode sobre una réplica abierta en solo lectura
+            pass
+    cursor.close()
+
+
+class RoutingSession(Session):
+    # Las lecturas de peticiones GET van a la réplica si está configurada;
+    # todo lo que se escribe (flush) sigue yendo al motor principal
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and REPLICA_BIND in self._db.engines
+            and has_app_context()
+            and g.get('use_replica', False)
+            and (clause is None or getattr(clause, 'is_select', False))
+        ):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,55 @@
+# Configuración de gunicorn para producción (Linux):
+#
+#     gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Por defecto un solo proceso con hilos: la caché de juegos, las revocaciones
+# de tokens y el limitador viven en memoria del proceso, y con varios workers
+# cada uno tendría su copia (precios antiguos, tokens revocados aceptados,
+# límites multiplicados). WEB_WORKERS > 1 solo arranca si en wsgi.py se han
+# configurado almacenes compartidos (ver wsgi.process_local_state).
+#
+# SIGTERM hace un cierre ordenado: los workers dejan de aceptar conexiones y
+# terminan las peticiones en curso (graceful_timeout).
+import multiprocessing
+import os
+import sys
+
+from config import env
+
+bind = env('WEB_BIND', '0.0.0.0:8000')
+workers = env('WEB_WORKERS', 1, int)
+threads = env('WEB_THREADS', 8, int)
+worker_class = 'gthread'
+timeout = env('WEB_TIMEOUT', 30, int)
+graceful_timeout = env('WEB_GRACEFUL_TIMEOUT', 30, int)
+keepalive = 5
+# Reciclar workers de vez en cuando acota el crecimiento de memoria
+max_requests = env('WEB_MAX_REQUESTS', 10000, int)
+max_requests_jitter = max_requests // 10
+accesslog = env('WEB_ACCESS_LOG')
+# Cada worker importa la aplicación: nada de conexiones heredadas del master
+preload_app = False
+
+# Cada worker tiene su pool de procesos para el hashing de contraseñas: se
+# reparten los núcleos entre los workers en lugar de usarlos todos en cada uno
+os.environ.setdefault('PASSWORD_HASH_WORKERS', str(max(1, multiprocessing.cpu_count() // workers)))
+
+
+def post_worker_init(worker):
+    if worker.cfg.workers <= 1:
+        return
+    from wsgi import process_local_state
+    local = process_local_state()
+    if local:
+        worker.log.error(
+            "WEB_WORKERS=%s con estado local en cada proceso: %s. Configura "
+            "almacenes compartidos en wsgi.py o usa un solo worker con más hilos.",
+            worker.cfg.workers, ", ".join(local)
+        )
+        # Código de fallo de arranque: el master se detiene en lugar de relanzarlo
+        sys.exit(3)
+
+
+def worker_exit(server, worker):
+    from wsgi import shutdown
+    shutdown()
@@ -0,0 +1,184 @@
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+
+import click
+from flask import Response, current_app, g, jsonify, make_response, request
+from flask.cli import AppGroup
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy.exc import IntegrityError
+
+from models import db, IdempotencyRecord
+
+# Cabecera Idempotency-Key para escrituras que el cliente puede reintentar.
+# La primera petición reclama la clave insertando una fila "en_curso" (la
+# clave primaria serializa los duplicados concurrentes). Las vistas con
+# efectos guardan su respuesta con stage_response en la misma transacción
+# que esos efectos: si el proceso cae tras el commit, el reintento recibe la
+# respuesta original en lugar de repetir la operación. Las respuestas que no
+# pasan por ahí (errores de validación...) se guardan al terminar la vista.
+# Las repeticiones la devuelven con una lectura por clave primaria, sin
+# volver a ejecutar la vista.
+
+IN_PROGRESS = "en_curso"
+COMPLETED = "completado"
+
+IDEMPOTENCY_KEY_MAX = 255
+# Una reclamación "en_curso" más antigua que esto es de un proceso caído
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+# Respuestas que no se guardan: el cliente puede reintentar con la misma clave
+RETRYABLE_STATUS = {409, 429}
+PURGE_BATCH_SIZE = 1000
+
+idempotency_cli = AppGroup('idempotency', help='Claves de idempotencia')
+
+_columns = (
+    IdempotencyRecord.fingerprint,
+    IdempotencyRecord.status,
+    IdempotencyRecord.response_status,
+    IdempotencyRecord.response_body,
+    IdempotencyRecord.response_mimetype,
+    IdempotencyRecord.created_at,
+    IdempotencyRecord.expires_at,
+)
+
+
+def _replay(row):
+    response = Response(row.response_body, status=row.response_status, mimetype=row.response_mimetype)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _discard(key, created_at=None):
+    # Sin created_at solo se borra la reclamación en curso: una respuesta ya
+    # confirmada con la transacción de la vista se conserva
+    query = db.delete(IdempotencyRecord).where(IdempotencyRecord.key == key)
+    if created_at is not None:
+        query = query.where(IdempotencyRecord.created_at == created_at)
+    else:
+        query = query.where(IdempotencyRecord.status == IN_PROGRESS)
+    db.session.execute(query.execution_options(synchronize_session=False))
+    db.session.commit()
+
+
+def _claim(key, fingerprint):
+    # None si esta petición se queda la clave; si no, la respuesta a devolver
+    ttl = timedelta(seconds=current_app.config['IDEMPOTENCY_TTL'])
+    for _ in range(3):
+        now = datetime.utcnow()
+        row = db.session.query(*_columns).filter(IdempotencyRecord.key == key).first()
+        if row is None:
+            try:
+                db.session.execute(db.insert(IdempotencyRecord).values(
+                    key=key, fingerprint=fingerprint, status=IN_PROGRESS,
+                    created_at=now, expires_at=now + ttl
+                ))
+                db.session.commit()
+                return None
+            except IntegrityError:
+                # Otra petición con la misma clave se adelantó
+                db.session.rollback()
+                continue
+        stale = row.status == IN_PROGRESS and row.created_at < now - timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT)
+        if row.expires_at <= now or stale:
+            _discard(key, row.created_at)
+            continue
+        db.session.rollback()
+        if row.fingerprint != fingerprint:
+            return jsonify({"msg": "Idempotency-Key ya usada con otra petición"}), 422
+        if row.status == IN_PROGRESS:
+            response = make_response(jsonify({"msg": "Hay una petición en curso con esta Idempotency-Key"}), 409)
+            response.headers['Retry-After'] = '1'
+            return response
+        return _replay(row)
+    return jsonify({"msg": "No se pudo reservar la Idempotency-Key, vuelve a intentarlo"}), 409
+
+
+def _complete(key, status, body, mimetype):
+    db.session.execute(
+        db.update(IdempotencyRecord).where(
+            IdempotencyRecord.key == key, IdempotencyRecord.status == IN_PROGRESS
+        ).values(
+            status=COMPLETED,
+            response_status=status,
+            response_body=body,
+            response_mimetype=mimetype
+        ).execution_options(synchronize_session=False)
+    )
+
+
+def stage_response(body, status=200):
+    # Guarda la respuesta JSON en la transacción en curso de la vista (sin
+    # commit); la vista debe devolver después exactamente esa respuesta. Sin
+    # Idempotency-Key no hace nada.
+    key = g.get('idempotency_key')
+    if key is None:
+        return
+    response = current_app.json.response(body)
+    _complete(key, status, response.get_data(as_text=True), response.mimetype)
+    g.idempotency_staged = True
+
+
+def _store(key, response):
+    # Respuestas que la vista no guardó con stage_response
+    _complete(key, response.status_code, response.get_data(as_text=True), response.mimetype)
+    db.session.commit()
+
+
+def idempotent(per_user=False):
+    # per_user: la clave se asocia al usuario del JWT (la vista ya debe
+    # exigirlo); si no, es global para el endpoint
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            client_key = request.headers.get('Idempotency-Key')
+            if client_key is None:
+                return fn(*args, **kwargs)
+            if not client_key or len(client_key) > IDEMPOTENCY_KEY_MAX:
+                return jsonify({"msg": "Idempotency-Key inválida"}), 400
+
+            scope = get_jwt_identity() if per_user else ''
+            key = hashlib.sha256(f"{request.endpoint}\n{scope}\n{client_key}".encode()).hexdigest()
+            digest = hashlib.sha256(f"{request.method} {request.full_path}\n".encode())
+            digest.update(request.get_data())
+            response = _claim(key, digest.hexdigest())
+            if response is not None:
+                return response
+
+            g.idempotency_key = key
+            try:
+                response = make_response(fn(*args, **kwargs))
+            except Exception:
+                db.session.rollback()
+                _discard(key)
+                raise
+            finally:
+                g.pop('idempotency_key', None)
+                staged = g.pop('idempotency_staged', False)
+            if response.status_code >= 500 or response.status_code in RETRYABLE_STATUS:
+                db.session.rollback()
+                _discard(key)
+            elif not staged:
+                _store(key, response)
+            return response
+        return decorator
+    return wrapper
+
+
+@idempotency_cli.command('purge')
+def purge_command():
+    """Borra las claves caducadas por lotes."""
+    total = 0
+    while True:
+        expired = db.select(IdempotencyRecord.key).where(
+            IdempotencyRecord.expires_at <= datetime.utcnow()
+        ).limit(PURGE_BATCH_SIZE)
+        result = db.session.execute(
+            db.delete(IdempotencyRecord).where(IdempotencyRecord.key.in_(expired))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        total += result.rowcount
+        if result.rowcount < PURGE_BATCH_SIZE:
+            break
+    click.echo(f"{total} claves caducadas borradas")
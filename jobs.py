@@ -0,0 +1,337 @@
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from models import db, User, Game, Order, OrderItem, Job
+from stock import COMPLETED, CANCELLED
+
+# Cola de trabajos persistente sobre la propia BD (patrón outbox): los
+# trabajos se insertan en la transacción del pedido, así que solo existen
+# si el pedido se confirmó. Un pool de hilos los reclama con un UPDATE
+# condicional, los ejecuta y los reintenta con espera exponencial. La
+# entrega es "al menos una vez": las tareas deben ser idempotentes.
+
+QUEUED = "pendiente"
+RUNNING = "en_curso"
+DONE = "completado"
+DEAD = "fallido"
+
+# Un trabajo en curso solo puede terminar, volver a la cola (reintento) o
+# agotar sus intentos
+JOB_TRANSITIONS = {
+    QUEUED: {RUNNING},
+    RUNNING: {DONE, QUEUED, DEAD},
+    DONE: set(),
+    DEAD: set(),
+}
+
+JOB_BACKOFF_BASE = 2.0
+JOB_BACKOFF_MAX = 300.0
+# Trabajos "en curso" más antiguos que esto se consideran de un worker caído
+JOB_LOCK_TIMEOUT = 300
+JOB_ERROR_MAX = 2000
+
+logger = logging.getLogger(__name__)
+
+jobs_cli = AppGroup('jobs', help='Cola de trabajos en segundo plano')
+
+TASKS = {}
+
+
+def task(name):
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+class JobStateError(Exception):
+    pass
+
+
+#########################################################
+#                                                       #
+#                       ENCOLADO                        #
+#                                                       #
+#########################################################
+
+def enqueue_many(jobs):
+    # jobs: lista de (nombre, payload, clave de idempotencia o None). Se añade
+    # a la transacción en curso; quien llama hace el commit. Las claves ya
+    # presentes se ignoran.
+    keys = [key for _, _, key in jobs if key]
+    existing = set()
+    if keys:
+        existing = {
+            row[0] for row in db.session.query(Job.idempotency_key).filter(Job.idempotency_key.in_(keys))
+        }
+    now = datetime.utcnow()
+    max_attempts = current_app.config['JOB_MAX_ATTEMPTS']
+    rows = []
+    for name, payload, key in jobs:
+        if name not in TASKS:
+            raise ValueError(f"Tarea desconocida: {name}")
+        if key and key in existing:
+            continue
+        existing.add(key)
+        rows.append({
+            "name": name,
+            "payload": json.dumps(payload),
+            "idempotency_key": key,
+            "status": QUEUED,
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "run_at": now,
+            "created_at": now
+        })
+    if rows:
+        db.session.execute(db.insert(Job), rows)
+    return len(rows)
+
+
+def enqueue(name, payload, key=None):
+    return enqueue_many([(name, payload, key)])
+
+
+#########################################################
+#                                                       #
+#                       EJECUCIÓN                       #
+#                                                       #
+#########################################################
+
+def backoff(attempts):
+    # Espera exponencial con jitter: ~2s, 4s, 8s... hasta JOB_BACKOFF_MAX
+    delay = min(JOB_BACKOFF_MAX, JOB_BACKOFF_BASE * (2 ** (attempts - 1)))
+    return delay * (0.5 + random.random() / 2)
+
+
+def _claimable(now):
+    stale = now - timedelta(seconds=JOB_LOCK_TIMEOUT)
+    return db.or_(
+        db.and_(Job.status == QUEUED, Job.run_at <= now),
+        db.and_(Job.status == RUNNING, Job.locked_at < stale)
+    )
+
+
+def claim(limit):
+    # Reclama hasta `limit` trabajos con un único UPDATE; el token identifica
+    # los que ha conseguido este worker aunque otro compita por los mismos
+    now = datetime.utcnow()
+    token = uuid.uuid4().hex
+    ready = db.select(Job.id).where(_claimable(now)).order_by(Job.run_at, Job.id).limit(limit)
+    result = db.session.execute(
+        db.update(Job)
+        .where(Job.id.in_(ready), _claimable(now))
+        .values(status=RUNNING, locked_by=token, locked_at=now, attempts=Job.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    if not result.rowcount:
+        return token, []
+    rows = db.session.query(Job.id, Job.name, Job.payload, Job.attempts, Job.max_attempts).filter(
+        Job.locked_by == token, Job.status == RUNNING
+    ).order_by(Job.id).all()
+    db.session.commit()
+    return token, rows
+
+
+def _transition(job_id, token, new_status, **values):
+    # Solo el worker que tiene el trabajo puede cambiar su estado
+    if new_status not in JOB_TRANSITIONS[RUNNING]:
+        raise JobStateError(f"Transición inválida: {RUNNING} -> {new_status}")
+    result = db.session.execute(
+        db.update(Job)
+        .where(Job.id == job_id, Job.locked_by == token, Job.status == RUNNING)
+        .values(status=new_status, **values)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def run_job(job, token):
+    handler = TASKS.get(job.name)
+    try:
+        if handler is None:
+            raise JobStateError(f"Tarea desconocida: {job.name}")
+        handler(json.loads(job.payload))
+        # Lo que escriba la tarea se confirma junto con el fin del trabajo
+        if not _transition(job.id, token, DONE, finished_at=datetime.utcnow(), locked_by=None, last_error=None):
+            logger.warning("El trabajo %s cambió de dueño durante la ejecución", job.id)
+        db.session.commit()
+        return True
+    except Exception as e:
+        db.session.rollback()
+        error = f"{type(e).__name__}: {e}"[:JOB_ERROR_MAX]
+        if job.attempts >= job.max_attempts:
+            logger.error("Trabajo %s (%s) descartado tras %s intentos: %s", job.id, job.name, job.attempts, error)
+            _transition(job.id, token, DEAD, finished_at=datetime.utcnow(), locked_by=None, last_error=error)
+        else:
+            run_at = datetime.utcnow() + timedelta(seconds=backoff(job.attempts))
+            _transition(job.id, token, QUEUED, run_at=run_at, locked_by=None, last_error=error)
+        db.session.commit()
+        return False
+
+
+def work_once(limit):
+    # Una ronda: reclamar, ejecutar y devolver cuántos trabajos se procesaron
+    token, claimed = claim(limit)
+    for job in claimed:
+        run_job(job, token)
+    return len(claimed)
+
+
+class WorkerPool:
+
+    def __init__(self, app, workers=None, batch_size=None, poll_interval=None):
+        self.app = app
+        self.workers = workers or app.config['JOB_WORKERS']
+        self.batch_size = batch_size or app.config['JOB_BATCH_SIZE']
+        self.poll_interval = poll_interval if poll_interval is not None else app.config['JOB_POLL_INTERVAL']
+        self.processed = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    count = work_once(self.batch_size)
+            except Exception:
+                # p. ej. BD bloqueada; se reintenta en la siguiente vuelta
+                logger.exception("Error en el worker de trabajos")
+                count = 0
+            if count:
+                with self._lock:
+                    self.processed += count
+            else:
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=None):
+        # Los trabajos en curso terminan antes de salir
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+
+@jobs_cli.command('work')
+@click.option('--workers', type=int, help='Hilos (por defecto JOB_WORKERS)')
+def work_command(workers):
+    """Procesa la cola hasta recibir Ctrl+C."""
+    pool = WorkerPool(current_app._get_current_object(), workers=workers)
+    pool.start()
+    click.echo(f"{pool.workers} workers procesando la cola (Ctrl+C para parar)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        click.echo("Parando, esperando a los trabajos en curso...")
+    pool.stop()
+    click.echo(f"{pool.processed} trabajos procesados")
+
+
+@jobs_cli.command('status')
+def status_command():
+    """Número de trabajos por estado."""
+    for status, count in db.session.query(Job.status, db.func.count()).group_by(Job.status):
+        click.echo(f"{status:<12} {count}")
+
+
+@jobs_cli.command('retry-failed')
+def retry_failed_command():
+    """Vuelve a encolar los trabajos fallidos."""
+    result = db.session.execute(
+        db.update(Job).where(Job.status == DEAD)
+        .values(status=QUEUED, attempts=0, run_at=datetime.utcnow(), finished_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    click.echo(f"{result.rowcount} trabajos reencolados")
+
+
+#########################################################
+#                                                       #
+#                  TAREAS DE PEDIDOS                    #
+#                                                       #
+#########################################################
+
+# Trabajo que se encola al llegar un pedido a cada estado
+ORDER_STATUS_JOBS = {
+    COMPLETED: 'order.completed',
+    CANCELLED: 'order.cancelled',
+}
+
+
+def order_jobs(order_id, status=None):
+    # (nombre, payload, clave) para un pedido nuevo o un cambio de estado
+    name = 'order.receipt' if status is None else ORDER_STATUS_JOBS.get(status)
+    if name is None:
+        return []
+    return [(name, {"order_id": order_id}, f"{name}:{order_id}")]
+
+
+def send_mail(to, subject, body):
+    # Stub local: no hay servidor de correo, se registra el envío
+    logger.info("Correo a %s: %s\n%s", to, subject, body)
+
+
+def _load_order(order_id, expected_status=None):
+    # Valida que el pedido sigue en el estado que originó el trabajo; si no
+    # (borrado, usuario borrado, o reintento tras otro cambio) la tarea no hace nada
+    row = db.session.query(Order.id, Order.status, User.email, User.username).join(
+        User, User.id == Order.user_id
+    ).filter(Order.id == order_id, Order.deleted_at.is_(None), User.deleted_at.is_(None)).first()
+    if row is None or (expected_status and row.status != expected_status):
+        return None
+    return row
+
+
+def _order_lines(order_id):
+    # Precio guardado en la línea: el del momento de la compra
+    return db.session.query(Game.title, OrderItem.quantity, OrderItem.unit_price).join(
+        Game, Game.id == OrderItem.game_id
+    ).filter(OrderItem.order_id == order_id).all()
+
+
+@task('order.receipt')
+def send_receipt(payload):
+    order = _load_order(payload["order_id"])
+    if order is None:
+        return
+    lines = _order_lines(order.id)
+    total = sum(quantity * price for _, quantity, price in lines)
+    body = "\n".join(f"{quantity} x {title} ({price:.2f})" for title, quantity, price in lines)
+    send_mail(order.email, f"Pedido {order.id} recibido", f"{body}\nTotal: {total:.2f}")
+
+
+@task('order.completed')
+def send_shipping_notice(payload):
+    order = _load_order(payload["order_id"], COMPLETED)
+    if order is None:
+        return
+    send_mail(order.email, f"Pedido {order.id} completado", f"Hola {order.username}, tu pedido está en camino.")
+
+
+@task('order.cancelled')
+def send_cancellation(payload):
+    order = _load_order(payload["order_id"], CANCELLED)
+    if order is None:
+        return
+    send_mail(order.email, f"Pedido {order.id} cancelado", f"Hola {order.username}, tu pedido ha sido cancelado.")
@@ -0,0 +1,216 @@
+import hmac
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+
+from flask import Response, abort, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Instrumentación por petición: latencia por endpoint, número de sentencias
+# SQL y tiempo en la BD (eventos del motor), log de consultas lentas,
+# cabecera Server-Timing y /metrics en formato de texto de Prometheus.
+# Por sentencia solo se suman contadores en el estado de la petición; los
+# histogramas compartidos se actualizan una vez por petición.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+SLOW_QUERY_PARAMS_MAX = 500
+# Tablas cuyos parámetros no se escriben en el log de consultas lentas:
+# hashes de contraseñas, emails y respuestas guardadas por Idempotency-Key
+SENSITIVE_TABLES = ('user', 'idempotency_record')
+_SENSITIVE_STATEMENT = re.compile(
+    r'\b(?:FROM|INTO|UPDATE|JOIN)\s+"?(?:%s)"?(?:\s|$|,|\))' % '|'.join(SENSITIVE_TABLES),
+    re.IGNORECASE
+)
+# Sin METRICS_TOKEN, /metrics solo responde a peticiones locales directas
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+_slow_query_seconds = None
+
+
+class RequestStats:
+    __slots__ = ('endpoint', 'start', 'statements', 'db_time')
+
+    def __init__(self, endpoint):
+        # Las peticiones sin ruta (404) se agrupan para no multiplicar las series
+        self.endpoint = endpoint or 'unmatched'
+        self.start = time.perf_counter()
+        self.statements = 0
+        self.db_time = 0.0
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += 1
+        self.sum += value
+
+    def render(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.total}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {self.total}'
+
+
+class Metrics:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.latency = {}
+        self.statements = {}
+        self.db_time = {}
+        self.slow_queries = 0
+
+    def observe(self, endpoint, method, status, duration, statements, db_time):
+        with self._lock:
+            key = (endpoint, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            histogram = self.latency.get((endpoint, method))
+            if histogram is None:
+                histogram = self.latency[(endpoint, method)] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(duration)
+            histogram = self.statements.get(endpoint)
+            if histogram is None:
+                histogram = self.statements[endpoint] = Histogram(STATEMENT_BUCKETS)
+            histogram.observe(statements)
+            self.db_time[endpoint] = self.db_time.get(endpoint, 0.0) + db_time
+
+    def slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def render(self):
+        with self._lock:
+            lines = [
+                '# HELP http_requests_total Peticiones atendidas',
+                '# TYPE http_requests_total counter',
+            ]
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+            lines += [
+                '# HELP http_request_duration_seconds Latencia por endpoint',
+                '# TYPE http_request_duration_seconds histogram',
+            ]
+            for (endpoint, method), histogram in sorted(self.latency.items()):
+                lines += histogram.render('http_request_duration_seconds', f'endpoint="{endpoint}",method="{method}"')
+            lines += [
+                '# HELP db_statements_per_request Sentencias SQL por petición',
+                '# TYPE db_statements_per_request histogram',
+            ]
+            for endpoint, histogram in sorted(self.statements.items()):
+                lines += histogram.render('db_statements_per_request', f'endpoint="{endpoint}"')
+            lines += [
+                '# HELP db_time_seconds_total Tiempo acumulado en la base de datos',
+                '# TYPE db_time_seconds_total counter',
+            ]
+            for endpoint, seconds in sorted(self.db_time.items()):
+                lines.append(f'db_time_seconds_total{{endpoint="{endpoint}"}} {seconds}')
+            lines += [
+                '# HELP db_slow_queries_total Consultas por encima de SLOW_QUERY_MS',
+                '# TYPE db_slow_queries_total counter',
+                f'db_slow_queries_total {self.slow_queries}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+def init_metrics(app):
+    global _slow_query_seconds
+    if not app.config['METRICS_ENABLED']:
+        return
+    _slow_query_seconds = app.config['SLOW_QUERY_MS'] / 1000.0
+    token = app.config['METRICS_TOKEN']
+
+    @app.before_request
+    def start_request_metrics():
+        _current.set(RequestStats(request.endpoint))
+
+    @app.after_request
+    def record_request_metrics(response):
+        stats = _current.get()
+        if stats is None:
+            return response
+        method, status = request.method, response.status_code
+
+        def finish():
+            _current.set(None)
+            duration = time.perf_counter() - stats.start
+            metrics.observe(stats.endpoint, method, status, duration, stats.statements, stats.db_time)
+            return duration
+
+        if response.is_streamed:
+            # El cuerpo se genera después de enviar las cabeceras: se mide al
+            # cerrar la respuesta y no se añade Server-Timing
+            response.call_on_close(finish)
+            return response
+        duration = finish()
+        response.headers.add(
+            'Server-Timing',
+            f'app;dur={duration * 1000:.2f}, db;dur={stats.db_time * 1000:.2f};desc="{stats.statements} sql"'
+        )
+        return response
+
+    def metrics_view():
+        if token:
+            if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+                abort(401)
+        elif request.remote_addr not in LOCAL_ADDRESSES or 'X-Forwarded-For' in request.headers:
+            # Un proxy en la misma máquina haría local cualquier petición
+            abort(403)
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_start'] = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop('query_start', None)
+    if start is None or _slow_query_seconds is None:
+        return
+    elapsed = time.perf_counter() - start
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_time += elapsed
+    if elapsed >= _slow_query_seconds:
+        metrics.slow_query()
+        if _SENSITIVE_STATEMENT.search(statement):
+            params = "(omitidos)"
+        elif executemany:
+            params = f"{len(parameters)} filas, primera: {parameters[0]!r}" if parameters else "[]"
+        else:
+            params = repr(parameters)
+        logger.warning(
+            "Consulta lenta (%.1f ms) en %s: %s | parámetros: %s",
+            elapsed * 1000,
+            stats.endpoint if stats is not None else '-',
+            ' '.join(statement.split()),
+            params[:SLOW_QUERY_PARAMS_MAX]
+        )
@@ -0,0 +1,40 @@
+"""Add unit_price to order items
+
+Revision ID: 1b6d8e2f4a70
+Revises: e7a3c9d14b58
+Create Date: 2026-10-17 21:05:37.640215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b6d8e2f4a70'
+down_revision = 'e7a3c9d14b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('order_item', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unit_price', sa.Float(), server_default='0', nullable=False))
+
+    with op.batch_alter_table('archived_order_item', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unit_price', sa.Float(), server_default='0', nullable=False))
+
+    # Las líneas existentes no guardaban el precio: se usa el actual del
+    # juego, que es lo que ya suponían los agregados de ventas
+    for table in ('order_item', 'archived_order_item'):
+        op.execute(
+            f'UPDATE {table} SET unit_price = '
+            f'COALESCE((SELECT price FROM game WHERE game.id = {table}.game_id), 0)'
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('archived_order_item', schema=None) as batch_op:
+        batch_op.drop_column('unit_price')
+
+    with op.batch_alter_table('order_item', schema=None) as batch_op:
+        batch_op.drop_column('unit_price')
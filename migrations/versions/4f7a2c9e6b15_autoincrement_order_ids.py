@@ -0,0 +1,49 @@
+"""Never reuse order and order item ids
+
+Revision ID: 4f7a2c9e6b15
+Revises: 8c2e5b7d1f43
+Create Date: 2026-10-17 22:31:04.517382
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f7a2c9e6b15'
+down_revision = '8c2e5b7d1f43'
+branch_labels = None
+depends_on = None
+
+# Tabla en uso y su archivo: el archivado conserva los ids, así que el
+# siguiente id tiene que quedar por encima de los dos
+TABLES = (('order', 'archived_order'), ('order_item', 'archived_order_item'))
+
+
+def upgrade():
+    # Sin AUTOINCREMENT, SQLite reutiliza el rowid más alto si se ha borrado
+    # (p. ej. al archivar los pedidos más recientes). Los demás motores usan
+    # secuencias que nunca retroceden.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table, _ in TABLES:
+        with op.batch_alter_table(table, schema=None, recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+            pass
+
+    for table, archive in TABLES:
+        op.execute(f"DELETE FROM sqlite_sequence WHERE name = '{table}'")
+        op.execute(
+            f"INSERT INTO sqlite_sequence (name, seq) SELECT '{table}', MAX("
+            f'COALESCE((SELECT MAX(id) FROM "{table}"), 0), '
+            f'COALESCE((SELECT MAX(id) FROM "{archive}"), 0))'
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table, _ in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None, recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+            pass
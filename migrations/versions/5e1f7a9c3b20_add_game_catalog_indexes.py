@@ -0,0 +1,30 @@
+"""Add catalog indexes to Game
+
+Revision ID: 5e1f7a9c3b20
+Revises: c4b2b155d7d2
+Create Date: 2026-10-17 09:02:11.418230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1f7a9c3b20'
+down_revision = 'c4b2b155d7d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('game', schema=None) as batch_op:
+        batch_op.create_index('ix_game_price_id', ['price', 'id'], unique=False)
+        batch_op.create_index('ix_game_stock_id', ['stock', 'id'], unique=False)
+        batch_op.create_index('ix_game_title_id', ['title', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('game', schema=None) as batch_op:
+        batch_op.drop_index('ix_game_title_id')
+        batch_op.drop_index('ix_game_stock_id')
+        batch_op.drop_index('ix_game_price_id')
@@ -0,0 +1,30 @@
+"""Drop unused game price and stock indexes
+
+Revision ID: 8c2e5b7d1f43
+Revises: 1b6d8e2f4a70
+Create Date: 2026-10-17 21:48:20.905113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c2e5b7d1f43'
+down_revision = '1b6d8e2f4a70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # El listado ordena por id: el planificador no puede usarlos y cada
+    # reserva de stock pagaba la escritura de ix_game_stock_id
+    with op.batch_alter_table('game', schema=None) as batch_op:
+        batch_op.drop_index('ix_game_stock_id')
+        batch_op.drop_index('ix_game_price_id')
+
+
+def downgrade():
+    with op.batch_alter_table('game', schema=None) as batch_op:
+        batch_op.create_index('ix_game_price_id', ['price', 'id'], unique=False)
+        batch_op.create_index('ix_game_stock_id', ['stock', 'id'], unique=False)
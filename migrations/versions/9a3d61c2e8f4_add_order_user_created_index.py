@@ -0,0 +1,26 @@
+"""Add (user_id, created_at) index to Order
+
+Revision ID: 9a3d61c2e8f4
+Revises: 5e1f7a9c3b20
+Create Date: 2026-10-17 10:41:37.092815
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a3d61c2e8f4'
+down_revision = '5e1f7a9c3b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.create_index('ix_order_user_id_created_at', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_index('ix_order_user_id_created_at')
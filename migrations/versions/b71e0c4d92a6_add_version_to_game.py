@@ -0,0 +1,26 @@
+"""Add version column to Game
+
+Revision ID: b71e0c4d92a6
+Revises: 9a3d61c2e8f4
+Create Date: 2026-10-17 11:58:04.330127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71e0c4d92a6'
+down_revision = '9a3d61c2e8f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('game', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('game', schema=None) as batch_op:
+        batch_op.drop_column('version')
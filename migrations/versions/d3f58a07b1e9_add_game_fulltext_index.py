@@ -0,0 +1,50 @@
+"""Add full-text search index for Game (SQLite FTS5)
+
+Revision ID: d3f58a07b1e9
+Revises: b71e0c4d92a6
+Create Date: 2026-10-17 13:22:48.615904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f58a07b1e9'
+down_revision = 'b71e0c4d92a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Solo SQLite tiene FTS5; en otros motores la búsqueda usa el índice en memoria
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS game_fts USING fts5("
+        "title, description, content='game', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS game_fts_ai AFTER INSERT ON game BEGIN "
+        "INSERT INTO game_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS game_fts_ad AFTER DELETE ON game BEGIN "
+        "INSERT INTO game_fts(game_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS game_fts_au AFTER UPDATE OF title, description ON game BEGIN "
+        "INSERT INTO game_fts(game_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+        "INSERT INTO game_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END"
+    )
+    op.execute("INSERT INTO game_fts(game_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TRIGGER IF EXISTS game_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS game_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS game_fts_ai")
+    op.execute("DROP TABLE IF EXISTS game_fts")
@@ -0,0 +1,85 @@
+"""Add soft delete and order archive
+
+Revision ID: e7a3c9d14b58
+Revises: c5b91e3d6a07
+Create Date: 2026-10-17 18:40:12.318904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a3c9d14b58'
+down_revision = 'c5b91e3d6a07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('order_item', schema=None) as batch_op:
+        batch_op.create_index('ix_order_item_order_id', ['order_id'], unique=False)
+
+    op.create_table('archived_order',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_order', schema=None) as batch_op:
+        batch_op.create_index('ix_archived_order_user_id_created_at', ['user_id', 'created_at'], unique=False)
+
+    op.create_table('archived_order_item',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('game_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['game_id'], ['game.id'], ),
+    sa.ForeignKeyConstraint(['order_id'], ['archived_order.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_order_item', schema=None) as batch_op:
+        batch_op.create_index('ix_archived_order_item_order_id', ['order_id'], unique=False)
+
+
+def downgrade():
+    # Los pedidos archivados vuelven a las tablas en uso antes de borrar el archivo
+    op.execute(
+        'INSERT INTO "order" (id, user_id, created_at, status) '
+        'SELECT id, user_id, created_at, status FROM archived_order WHERE deleted_at IS NULL'
+    )
+    op.execute(
+        'INSERT INTO order_item (id, order_id, game_id, quantity) '
+        'SELECT i.id, i.order_id, i.game_id, i.quantity FROM archived_order_item i '
+        'JOIN archived_order o ON o.id = i.order_id WHERE o.deleted_at IS NULL'
+    )
+
+    with op.batch_alter_table('archived_order_item', schema=None) as batch_op:
+        batch_op.drop_index('ix_archived_order_item_order_id')
+
+    op.drop_table('archived_order_item')
+    with op.batch_alter_table('archived_order', schema=None) as batch_op:
+        batch_op.drop_index('ix_archived_order_user_id_created_at')
+
+    op.drop_table('archived_order')
+    with op.batch_alter_table('order_item', schema=None) as batch_op:
+        batch_op.drop_index('ix_order_item_order_id')
+
+    # Sin borrado lógico, los pedidos marcados como borrados desaparecen
+    op.execute('DELETE FROM order_item WHERE order_id IN (SELECT id FROM "order" WHERE deleted_at IS NOT NULL)')
+    op.execute('DELETE FROM "order" WHERE deleted_at IS NOT NULL')
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_column('deleted_at')
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('deleted_at')
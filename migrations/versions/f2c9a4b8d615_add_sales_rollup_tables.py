@@ -0,0 +1,51 @@
+"""Add pre-aggregated sales tables
+
+Revision ID: f2c9a4b8d615
+Revises: d3f58a07b1e9
+Create Date: 2026-10-17 14:05:12.384120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c9a4b8d615'
+down_revision = 'd3f58a07b1e9'
+branch_labels = None
+depends_on = None
+
+
+def metric_columns():
+    return [
+        sa.Column('orders', sa.Integer(), nullable=False),
+        sa.Column('units_sold', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=False),
+        sa.Column('cancelled_orders', sa.Integer(), nullable=False),
+        sa.Column('units_cancelled', sa.Integer(), nullable=False),
+    ]
+
+
+def upgrade():
+    op.create_table('sales_by_game',
+    sa.Column('game_id', sa.Integer(), nullable=False),
+    *metric_columns(),
+    sa.PrimaryKeyConstraint('game_id')
+    )
+    with op.batch_alter_table('sales_by_game', schema=None) as batch_op:
+        batch_op.create_index('ix_sales_by_game_units_sold', ['units_sold'], unique=False)
+
+    op.create_table('sales_by_day',
+    sa.Column('day', sa.Date(), nullable=False),
+    *metric_columns(),
+    sa.PrimaryKeyConstraint('day')
+    )
+    # Los pedidos existentes se agregan con `flask reports rebuild`
+
+
+def downgrade():
+    op.drop_table('sales_by_day')
+    with op.batch_alter_table('sales_by_game', schema=None) as batch_op:
+        batch_op.drop_index('ix_sales_by_game_units_sold')
+
+    op.drop_table('sales_by_game')
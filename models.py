@@ -1,7 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from config import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -9,34 +10,156 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
     is_admin = db.Column(db.Boolean, default=True)
+    # Borrado lógico: el usuario y sus pedidos se conservan
+    deleted_at = db.Column(db.DateTime, nullable=True)
 
     orders = db.relationship('Order', backref='user', lazy=True)
 
 
 class Game(db.Model):
+    # Listado por prefijo de título (keyset sobre title, id) y upsert por
+    # título de la importación. Los filtros de precio y stock no llevan
+    # índice: el listado los evalúa recorriendo la clave primaria desde el cursor.
+    __table_args__ = (
+        db.Index('ix_game_title_id', 'title', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
     price = db.Column(db.Float, nullable=False)
     stock = db.Column(db.Integer, default=0)
+    # Control de concurrencia optimista: se incrementa en cada cambio de stock
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
 
     order_items = db.relationship('OrderItem', backref='game', lazy=True)
 
+    __mapper_args__ = {"version_id_col": version}
+
 
 class Order(db.Model):
+    # Historial de pedidos por usuario, paginado por (created_at, id).
+    # AUTOINCREMENT: los ids archivados no se vuelven a asignar (ver archive.py)
+    __table_args__ = (
+        db.Index('ix_order_user_id_created_at', 'user_id', 'created_at'),
+        {'sqlite_autoincrement': True},
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(20), default="pendiente")  # pendiente, completado, cancelado
+    deleted_at = db.Column(db.DateTime, nullable=True)
 
     items = db.relationship('OrderItem', backref='order', lazy=True, cascade="all, delete-orphan")
 
 
 class OrderItem(db.Model):
+    __table_args__ = (
+        db.Index('ix_order_item_order_id', 'order_id'),
+        {'sqlite_autoincrement': True},
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
     game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False, default=1)
+    # Precio del juego al crear el pedido; los cambios de precio posteriores no le afectan
+    unit_price = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+
+
+# Pedidos terminados (completados, cancelados o borrados) antiguos, movidos
+# fuera de las tablas de pedidos en uso (ver archive.py). Conservan sus ids.
+
+class ArchivedOrder(db.Model):
+    __table_args__ = (
+        db.Index('ix_archived_order_user_id_created_at', 'user_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime)
+    status = db.Column(db.String(20))
+    deleted_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    items = db.relationship('ArchivedOrderItem', lazy=True, cascade="all, delete-orphan")
+
+
+class ArchivedOrderItem(db.Model):
+    __table_args__ = (
+        db.Index('ix_archived_order_item_order_id', 'order_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('archived_order.id'), nullable=False)
+    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=1)
+    unit_price = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+
+    game = db.relationship('Game', lazy=True)
+
+
+# Agregados de ventas mantenidos de forma incremental (ver reports.py)
+
+class SalesByGame(db.Model):
+    __table_args__ = (
+        db.Index('ix_sales_by_game_units_sold', 'units_sold'),
+    )
+
+    game_id = db.Column(db.Integer, primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    units_sold = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    cancelled_orders = db.Column(db.Integer, nullable=False, default=0)
+    units_cancelled = db.Column(db.Integer, nullable=False, default=0)
+
+
+class SalesByDay(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    units_sold = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    cancelled_orders = db.Column(db.Integer, nullable=False, default=0)
+    units_cancelled = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Cola de trabajos persistente (ver jobs.py). Se escribe en la misma
+# transacción que el pedido que la origina.
+
+class Job(db.Model):
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    idempotency_key = db.Column(db.String(100), unique=True, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default="pendiente")  # pendiente, en_curso, completado, fallido
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(32), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
 
+# Respuestas guardadas por Idempotency-Key (ver idempotency.py)
 
+class IdempotencyRecord(db.Model):
+    __table_args__ = (
+        db.Index('ix_idempotency_record_expires_at', 'expires_at'),
+    )
 
+    # sha256 de (endpoint, usuario, clave del cliente)
+    key = db.Column(db.String(64), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # en_curso, completado
+    response_status = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    response_mimetype = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
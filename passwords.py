@@ -0,0 +1,114 @@
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+from werkzeug.security import generate_password_hash, check_password_hash
+
+BCRYPT = "bcrypt"
+PBKDF2 = "pbkdf2"
+
+# Coste por defecto de cada algoritmo (rondas de bcrypt, iteraciones de pbkdf2)
+DEFAULT_COSTS = {BCRYPT: 12, PBKDF2: 600000}
+# Por debajo de esto pbkdf2-sha256 no protege frente a un ataque por diccionario
+PBKDF2_MIN_COST = 100000
+
+
+#########################################################
+#                                                       #
+#          FUNCIONES EJECUTADAS EN LOS PROCESOS         #
+#                                                       #
+#########################################################
+
+def _hash_password(password, algorithm, cost):
+    if algorithm == BCRYPT:
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=cost)).decode()
+    return generate_password_hash(password, method=f"pbkdf2:sha256:{cost}")
+
+
+def _verify_password(hashed, password):
+    # Admite hashes bcrypt y los de Werkzeug guardados antes de este servicio
+    if hashed.startswith("$2"):
+        return bcrypt.checkpw(password.encode(), hashed.encode())
+    return check_password_hash(hashed, password)
+
+
+def check_cost(algorithm, cost):
+    # Un coste fuera de rango se rechaza al arrancar, no al primer registro
+    if algorithm == BCRYPT and not 4 <= cost <= 31:
+        raise ValueError(f"PASSWORD_HASH_COST para bcrypt debe estar entre 4 y 31 (es {cost})")
+    if algorithm == PBKDF2 and cost < PBKDF2_MIN_COST:
+        raise ValueError(f"PASSWORD_HASH_COST para pbkdf2 debe ser al menos {PBKDF2_MIN_COST} (es {cost})")
+    return cost
+
+
+#########################################################
+#                                                       #
+#                  SERVICIO DE HASHING                  #
+#                                                       #
+#########################################################
+
+class PasswordHasher:
+    # El hash de contraseñas es trabajo de CPU deliberadamente lento; se
+    # ejecuta en un pool de procesos para no bloquear el worker y usar todos
+    # los núcleos. Con PASSWORD_HASH_WORKERS = 0 se ejecuta en línea.
+
+    def __init__(self, app=None):
+        self.algorithm = BCRYPT
+        self.cost = 12
+        self.workers = os.cpu_count() or 1
+        self._pool = None
+        self._lock = threading.Lock()
+        self._dummy_hash = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_ALGORITHM', BCRYPT)
+        algorithm = app.config['PASSWORD_HASH_ALGORITHM']
+        if algorithm not in DEFAULT_COSTS:
+            raise ValueError(f"PASSWORD_HASH_ALGORITHM desconocido: {algorithm}")
+        app.config.setdefault('PASSWORD_HASH_COST', DEFAULT_COSTS[algorithm])
+        app.config.setdefault('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+        self.algorithm = algorithm
+        self.cost = check_cost(algorithm, int(app.config['PASSWORD_HASH_COST']))
+        self.workers = int(app.config['PASSWORD_HASH_WORKERS'])
+        self._dummy_hash = None
+        app.extensions['passwords'] = self
+
+    def _run(self, func, *args):
+        if self.workers <= 0:
+            return func(*args)
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                    atexit.register(self.shutdown)
+        return self._pool.submit(func, *args).result()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def hash(self, password):
+        return self._run(_hash_password, password, self.algorithm, self.cost)
+
+    def verify(self, hashed, password):
+        return self._run(_verify_password, hashed, password)
+
+    def reject(self, password):
+        # Para usuarios inexistentes: mismo coste que una verificación real,
+        # así el tiempo de respuesta no revela si el usuario existe
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash(os.urandom(16).hex())
+        self.verify(self._dummy_hash, password)
+        return False
+
+    def needs_rehash(self, hashed):
+        if self.algorithm == BCRYPT:
+            if not hashed.startswith("$2"):
+                return True
+            return hashed.split("$")[2] != f"{self.cost:02d}"
+        return not hashed.startswith(f"pbkdf2:sha256:{self.cost}$")
@@ -0,0 +1,172 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache, wraps
+
+from flask import current_app, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+
+# Limitación de peticiones con cubos de fichas (token bucket) y descarte de
+# carga por prioridad. Los cubos viven en un RateLimitStore: el local sirve
+# para un proceso; con varios workers se puede sustituir por uno compartido
+# (Redis...) con la misma interfaz.
+
+# Prioridades para el descarte de carga: cuanto más baja, antes se descarta
+LOW = 0
+NORMAL = 1
+HIGH = 2
+
+# Fracción de SHED_MAX_IN_FLIGHT a partir de la cual se descarta cada prioridad
+SHED_IN_FLIGHT_FRACTION = {LOW: 0.5, NORMAL: 0.8, HIGH: 1.0}
+# Múltiplo de SHED_LATENCY_MS a partir del cual se descarta cada prioridad;
+# las de prioridad alta no se descartan por latencia
+SHED_LATENCY_FACTOR = {LOW: 1.0, NORMAL: 2.0, HIGH: None}
+LATENCY_EWMA_ALPHA = 0.1
+SHED_RETRY_AFTER = 1
+
+
+@lru_cache(maxsize=None)
+def parse_limit(value):
+    # "10/60" -> 10 peticiones cada 60 segundos
+    count, period = value.split('/')
+    return int(count), float(period)
+
+
+class RateLimitStore:
+    # Interfaz para un almacén de cubos compartido entre procesos
+
+    def consume(self, key, limit, period, cost=1):
+        # Devuelve 0 si hay fichas, o los segundos hasta que las haya
+        raise NotImplementedError
+
+    def reset(self):
+        raise NotImplementedError
+
+
+class LocalRateLimitStore(RateLimitStore):
+    # Cubos en memoria con expulsión LRU; un cubo expulsado vuelve lleno
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, limit, period, cost=1):
+        now = time.monotonic()
+        rate = limit / period
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = float(limit)
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                tokens = min(float(limit), bucket[0] + (now - bucket[1]) * rate)
+                self._buckets.move_to_end(key)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                return 0
+            self._buckets[key] = (tokens, now)
+            return (cost - tokens) / rate
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class LoadShedder:
+    # Peticiones en curso en este proceso y latencia media (EWMA)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.latency = 0.0
+        self.shed = 0
+
+    def enter(self, priority, max_in_flight, latency_threshold):
+        with self._lock:
+            if max_in_flight and self.in_flight >= max_in_flight * SHED_IN_FLIGHT_FRACTION[priority]:
+                self.shed += 1
+                return False
+            factor = SHED_LATENCY_FACTOR[priority]
+            if latency_threshold and factor and self.latency > latency_threshold * factor:
+                # Se deja pasar alguna petición para que la media pueda bajar
+                self.latency *= 1 - LATENCY_EWMA_ALPHA
+                self.shed += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self, duration):
+        with self._lock:
+            self.in_flight -= 1
+            self.latency += LATENCY_EWMA_ALPHA * (duration - self.latency)
+
+
+def _too_many(msg, status, retry_after):
+    response = make_response(jsonify({"msg": msg}), status)
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+class RateLimiter:
+
+    def __init__(self, store=None):
+        self.store = store or LocalRateLimitStore()
+        self.shedder = LoadShedder()
+
+    def init_app(self, app):
+        app.extensions['rate_limiter'] = self
+        if not app.config['RATELIMIT_ENABLED']:
+            return
+        default = parse_limit(app.config['RATELIMIT_DEFAULT'])
+        max_in_flight = app.config['SHED_MAX_IN_FLIGHT']
+        latency_threshold = app.config['SHED_LATENCY_MS'] / 1000.0
+
+        @app.before_request
+        def limit_and_shed():
+            req = request._get_current_object()
+            view = app.view_functions.get(req.endpoint)
+            priority = getattr(view, 'shed_priority', NORMAL)
+            retry_after = self.store.consume(f"ip:{req.remote_addr}", *default)
+            if retry_after:
+                return _too_many("Demasiadas peticiones, vuelve a intentarlo más tarde", 429, retry_after)
+            if not self.shedder.enter(priority, max_in_flight, latency_threshold):
+                return _too_many("Servidor saturado, vuelve a intentarlo más tarde", 503, SHED_RETRY_AFTER)
+            req.environ['ratelimit.start'] = time.perf_counter()
+
+        @app.teardown_request
+        def release_slot(exc):
+            start = request.environ.pop('ratelimit.start', None)
+            if start is not None:
+                self.shedder.leave(time.perf_counter() - start)
+
+    def limit(self, config_key, by='ip'):
+        # Límite propio de la ruta, por IP o por usuario del JWT (la vista ya
+        # debe exigirlo). config_key es el nombre de la opción con "N/segundos".
+        def wrapper(fn):
+            @wraps(fn)
+            def decorator(*args, **kwargs):
+                config = current_app.config
+                if config['RATELIMIT_ENABLED']:
+                    req = request._get_current_object()
+                    who = get_jwt_identity() if by == 'user' else req.remote_addr
+                    limit, period = parse_limit(config[config_key])
+                    retry_after = self.store.consume(f"{req.endpoint}:{by}:{who}", limit, period)
+                    if retry_after:
+                        return _too_many("Demasiadas peticiones, vuelve a intentarlo más tarde", 429, retry_after)
+                return fn(*args, **kwargs)
+            return decorator
+        return wrapper
+
+
+def priority(level):
+    # Marca la vista para el descarte de carga (LOW, NORMAL, HIGH)
+    def wrapper(fn):
+        fn.shed_priority = level
+        return fn
+    return wrapper
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,182 @@
+from datetime import date, datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+
+from models import db, Order, OrderItem, ArchivedOrder, ArchivedOrderItem, SalesByGame, SalesByDay
+from stock import CANCELLED
+
+# Los agregados se actualizan en la misma transacción que el pedido, así que
+# los informes nunca recorren order/order_item. Los ingresos salen del
+# precio guardado en cada línea (OrderItem.unit_price), de modo que sumar y
+# restar un pedido da siempre lo mismo aunque el juego cambie de precio.
+# `orders` cuenta todos los pedidos, también los cancelados (que además
+# cuentan en `cancelled_orders`).
+
+METRICS = ('orders', 'units_sold', 'revenue', 'cancelled_orders', 'units_cancelled')
+REBUILD_CHUNK_SIZE = 5000
+REPORT_MAX_DAYS = 366
+
+reports_cli = AppGroup('reports', help='Agregados de ventas')
+
+
+def _add(target, key, **deltas):
+    row = target.setdefault(key, dict.fromkeys(METRICS, 0))
+    for name, value in deltas.items():
+        row[name] += value
+
+
+def _upsert(model, key_column, deltas):
+    # Un UPDATE con CASE para todas las filas existentes y un INSERT masivo
+    # para las que faltan; el número de sentencias no depende del pedido
+    deltas = {key: row for key, row in deltas.items() if any(row.values())}
+    if not deltas:
+        return
+    keys = list(deltas)
+    existing = {
+        row[0] for row in db.session.query(key_column).filter(key_column.in_(keys))
+    }
+    if existing:
+        values = {
+            name: getattr(model, name) + db.case(
+                {key: deltas[key][name] for key in existing}, value=key_column
+            )
+            for name in METRICS
+        }
+        db.session.execute(
+            db.update(model)
+            .where(key_column.in_(list(existing)))
+            .values(values)
+            .execution_options(synchronize_session=False)
+        )
+    missing = [key for key in keys if key not in existing]
+    if missing:
+        db.session.execute(db.insert(model), [
+            {key_column.key: key, **deltas[key]} for key in missing
+        ])
+
+
+def apply_sales(games, days):
+    _upsert(SalesByGame, SalesByGame.game_id, games)
+    _upsert(SalesByDay, SalesByDay.day, days)
+
+
+def order_lines(order_id, item_model=OrderItem):
+    # {game_id: (unidades, ingresos)} de un pedido en una consulta; item_model
+    # es ArchivedOrderItem para los pedidos archivados
+    rows = db.session.query(
+        item_model.game_id,
+        db.func.sum(item_model.quantity),
+        db.func.sum(item_model.quantity * item_model.unit_price)
+    ).filter(item_model.order_id == order_id).group_by(item_model.game_id).all()
+    return {game_id: (quantity, revenue or 0.0) for game_id, quantity, revenue in rows}
+
+
+def add_line(lines, game_id, quantity, unit_price):
+    units, revenue = lines.get(game_id, (0, 0.0))
+    lines[game_id] = (units + quantity, revenue + quantity * (unit_price or 0.0))
+
+
+def _day(order):
+    return (order.created_at or datetime.utcnow()).date()
+
+
+def _contribution(games, days, day, lines, status, sign):
+    # Lo que aporta un pedido a los agregados según su estado
+    units = sum(quantity for quantity, _ in lines.values())
+    if status == CANCELLED:
+        _add(days, day, orders=sign, cancelled_orders=sign, units_cancelled=sign * units)
+        for game_id, (quantity, _) in lines.items():
+            _add(games, game_id, orders=sign, cancelled_orders=sign, units_cancelled=sign * quantity)
+    else:
+        revenue = sum(amount for _, amount in lines.values())
+        _add(days, day, orders=sign, units_sold=sign * units, revenue=sign * revenue)
+        for game_id, (quantity, amount) in lines.items():
+            _add(games, game_id, orders=sign, units_sold=sign * quantity, revenue=sign * amount)
+
+
+def record_new_orders(orders):
+    # orders: lista de (order, {game_id: (unidades, ingresos)})
+    games, days = {}, {}
+    for order, lines in orders:
+        _contribution(games, days, _day(order), lines, order.status, 1)
+    apply_sales(games, days)
+
+
+def record_status_change(order, old_status, lines=None):
+    if old_status == order.status:
+        return
+    lines = order_lines(order.id) if lines is None else lines
+    games, days = {}, {}
+    _contribution(games, days, _day(order), lines, old_status, -1)
+    _contribution(games, days, _day(order), lines, order.status, 1)
+    apply_sales(games, days)
+
+
+def record_deletion(order, lines=None):
+    lines = order_lines(order.id) if lines is None else lines
+    games, days = {}, {}
+    _contribution(games, days, _day(order), lines, order.status, -1)
+    apply_sales(games, days)
+
+
+def _accumulate(games, days, order_model, item_model, chunk_size, progress, processed):
+    # Suma los pedidos no borrados de una tabla (en uso o archivo) por bloques
+    last_id = 0
+    while True:
+        orders = db.session.query(order_model.id, order_model.created_at, order_model.status).filter(
+            order_model.id > last_id, order_model.deleted_at.is_(None)
+        ).order_by(order_model.id).limit(chunk_size).all()
+        if not orders:
+            return processed
+        ids = [order.id for order in orders]
+        lines = {}
+        for order_id, game_id, quantity, unit_price in db.session.query(
+            item_model.order_id, item_model.game_id, item_model.quantity, item_model.unit_price
+        ).filter(item_model.order_id.in_(ids)):
+            add_line(lines.setdefault(order_id, {}), game_id, quantity, unit_price)
+        for order in orders:
+            _contribution(games, days, _day(order), lines.get(order.id, {}), order.status, 1)
+        last_id = ids[-1]
+        processed += len(orders)
+        if progress:
+            progress(processed)
+
+
+def rebuild(chunk_size=REBUILD_CHUNK_SIZE, progress=None):
+    # Recalcula desde cero leyendo los pedidos en uso y los archivados por
+    # bloques (keyset sobre id); en memoria solo viven los agregados
+    games, days = {}, {}
+    processed = _accumulate(games, days, Order, OrderItem, chunk_size, progress, 0)
+    processed = _accumulate(games, days, ArchivedOrder, ArchivedOrderItem, chunk_size, progress, processed)
+
+    db.session.execute(db.delete(SalesByGame))
+    db.session.execute(db.delete(SalesByDay))
+    if games:
+        db.session.execute(db.insert(SalesByGame), [{"game_id": k, **v} for k, v in games.items()])
+    if days:
+        db.session.execute(db.insert(SalesByDay), [{"day": k, **v} for k, v in days.items()])
+    db.session.commit()
+    return processed
+
+
+@reports_cli.command('rebuild')
+@click.option('--chunk-size', default=REBUILD_CHUNK_SIZE, show_default=True)
+def rebuild_command(chunk_size):
+    """Recalcula los agregados de ventas a partir de los pedidos."""
+    total = rebuild(chunk_size, progress=lambda n: click.echo(f"{n} pedidos procesados"))
+    click.echo(f"Agregados reconstruidos a partir de {total} pedidos")
+
+
+def parse_day_range(start, end):
+    end = date.fromisoformat(end) if end else datetime.utcnow().date()
+    start = date.fromisoformat(start) if start else end - timedelta(days=29)
+    if start > end or (end - start).days >= REPORT_MAX_DAYS:
+        raise ValueError("rango de fechas inválido")
+    return start, end
+
+
+def serialize(row, key_name, key):
+    data = {key_name: key}
+    data.update({name: getattr(row, name) if row else 0 for name in METRICS})
+    return data
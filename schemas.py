@@ -0,0 +1,180 @@
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from flask_marshmallow import Marshmallow
+from marshmallow import fields
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - se usa el codificador estándar
+    orjson = None
+
+ma = Marshmallow()
+
+
+class FieldSelectionError(ValueError):
+    pass
+
+
+#########################################################
+#                                                       #
+#                       ESQUEMAS                        #
+#                                                       #
+#########################################################
+
+class UserSchema(ma.Schema):
+    id = fields.Integer()
+    username = fields.String()
+    email = fields.String()
+    is_admin = fields.Boolean()
+
+
+class GameSchema(ma.Schema):
+    id = fields.Integer()
+    title = fields.String()
+    description = fields.String()
+    price = fields.Float()
+    stock = fields.Integer()
+
+
+class OrderItemSchema(ma.Schema):
+    game_id = fields.Integer()
+    quantity = fields.Integer()
+    unit_price = fields.Float()
+    game = fields.Nested(GameSchema, only=("title", "price"))
+
+
+class OrderSchema(ma.Schema):
+    id = fields.Integer()
+    user_id = fields.Integer()
+    created_at = fields.DateTime()
+    status = fields.String()
+    items = fields.Nested(OrderItemSchema, many=True)
+
+
+def _unknown_fields(schema_cls, names, allowed=None):
+    # Comprueba cada ruta con puntos contra los campos declarados, bajando
+    # por los Nested (y su only, si lo tienen)
+    declared = schema_cls._declared_fields
+    unknown, nested = [], {}
+    for name in names:
+        head, _, rest = name.partition('.')
+        field = declared.get(head)
+        if field is None or (allowed is not None and head not in allowed):
+            unknown.append(name)
+        elif rest:
+            if isinstance(field, fields.Nested) and isinstance(field.nested, type):
+                nested.setdefault(head, []).append(rest)
+            else:
+                unknown.append(name)
+    for head, rest in nested.items():
+        field = declared[head]
+        unknown += [f"{head}.{name}" for name in _unknown_fields(field.nested, rest, field.only)]
+    return unknown
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def _nested(dump, many):
+    if many:
+        return lambda values: [dump(value) for value in values] if values is not None else None
+    return lambda value: dump(value) if value is not None else None
+
+
+def _compile(schema):
+    # Convierte un esquema (ya con su only aplicado) en una función que
+    # construye el diccionario con attrgetter/itemgetter, sin pasar por
+    # Schema.dump: los Nested se compilan aquí, no de forma perezosa en cada
+    # dump(). Los tipos simples se copian tal cual (las columnas ya tienen el
+    # tipo del campo); solo las fechas se convierten.
+    keys, attributes, converters = [], [], []
+    for name, field in schema.fields.items():
+        keys.append(field.data_key or name)
+        attributes.append(field.attribute or name)
+        if isinstance(field, fields.Nested):
+            converters.append((len(keys) - 1, _nested(_compile(field.schema), field.many)))
+        elif isinstance(field, fields.DateTime):
+            converters.append((len(keys) - 1, _isoformat))
+
+    if len(attributes) == 1:
+        get_attrs = lambda obj, get=attrgetter(attributes[0]): (get(obj),)
+        get_items = lambda obj, get=itemgetter(attributes[0]): (get(obj),)
+    else:
+        get_attrs, get_items = attrgetter(*attributes), itemgetter(*attributes)
+
+    def dump(obj):
+        values = get_items(obj) if isinstance(obj, dict) else get_attrs(obj)
+        if converters:
+            values = list(values)
+            for index, convert in converters:
+                values[index] = convert(values[index])
+        return dict(zip(keys, values))
+    return dump
+
+
+class CompiledSchema:
+    # Misma interfaz que usa la API de un Schema (fields, dump) con el volcado compilado
+
+    def __init__(self, schema):
+        self.fields = schema.fields
+        self.many = schema.many
+        self._dump = _compile(schema)
+
+    def dump(self, obj):
+        if self.many:
+            return [self._dump(item) for item in obj]
+        return self._dump(obj)
+
+
+@lru_cache(maxsize=256)
+def get_schema(schema_cls, only=None, many=False):
+    # Las instancias se construyen y compilan una vez por combinación de
+    # campos y se reutilizan. Toda la validación de ?fields= ocurre aquí, de
+    # modo que un campo anidado inválido da 400 y no un error en dump()
+    if only:
+        unknown = sorted(_unknown_fields(schema_cls, only))
+        if unknown:
+            raise FieldSelectionError(", ".join(unknown))
+    try:
+        return CompiledSchema(schema_cls(only=only, many=many))
+    except ValueError as e:
+        raise FieldSelectionError(str(e))
+
+
+def requested_fields():
+    # ?fields=id,title,items.game_id -> ('id', 'items.game_id', 'title')
+    raw = request.args.get('fields', '')
+    names = {name.strip() for name in raw.split(',') if name.strip()}
+    return tuple(sorted(names)) or None
+
+
+def schema_for(schema_cls, many=False):
+    return get_schema(schema_cls, requested_fields(), many)
+
+
+#########################################################
+#                                                       #
+#                     CODIFICADOR JSON                  #
+#                                                       #
+#########################################################
+
+class FastJSONProvider(DefaultJSONProvider):
+    # Usa orjson cuando está disponible; si no, el proveedor por defecto de Flask
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(f"{self.dumps(obj)}\n", mimetype=self.mimetype)
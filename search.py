@@ -0,0 +1,270 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from config import RoutingSession
+from models import db, Game
+
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+# Índice FTS5 de contenido externo sobre la tabla game. Los triggers lo
+# mantienen sincronizado; el de UPDATE solo salta si cambian título o
+# descripción, así los descuentos de stock no tocan el índice.
+FTS5_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS game_fts USING fts5("
+    "title, description, content='game', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS game_fts_ai AFTER INSERT ON game BEGIN "
+    "INSERT INTO game_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS game_fts_ad AFTER DELETE ON game BEGIN "
+    "INSERT INTO game_fts(game_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS game_fts_au AFTER UPDATE OF title, description ON game BEGIN "
+    "INSERT INTO game_fts(game_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO game_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    # Minúsculas y sin tildes, igual que unicode61 remove_diacritics
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return TOKEN_RE.findall(text)
+
+
+#########################################################
+#                                                       #
+#                      FTS5 (SQLite)                    #
+#                                                       #
+#########################################################
+
+class FTS5Backend:
+    name = 'fts5'
+
+    @staticmethod
+    def install(connection):
+        # Crea la tabla y los triggers si faltan; si la tabla es nueva se
+        # indexa el catálogo existente
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'game_fts'"
+        ).first()
+        for statement in FTS5_DDL:
+            connection.exec_driver_sql(statement)
+        if not exists:
+            connection.exec_driver_sql("INSERT INTO game_fts(game_fts) VALUES ('rebuild')")
+
+    def search(self, terms, limit, offset):
+        # Cada término como prefijo entre comillas: "zel"* AND "bre"*
+        match = ' '.join(f'"{term}"*' for term in terms)
+        rows = db.session.execute(
+            db.text(
+                "SELECT rowid FROM game_fts WHERE game_fts MATCH :match "
+                "ORDER BY bm25(game_fts, :title_weight, :description_weight) "
+                "LIMIT :limit OFFSET :offset"
+            ),
+            {
+                "match": match,
+                "title_weight": TITLE_WEIGHT,
+                "description_weight": DESCRIPTION_WEIGHT,
+                "limit": limit,
+                "offset": offset
+            }
+        )
+        return [row[0] for row in rows]
+
+
+#########################################################
+#                                                       #
+#              ÍNDICE INVERTIDO EN PYTHON               #
+#                                                       #
+#########################################################
+
+class InvertedIndexBackend:
+    # Alternativa para motores sin FTS5. Se construye en memoria leyendo el
+    # catálogo por bloques y se mantiene con eventos de sesión.
+    name = 'memory'
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.postings = {}
+        self.terms = []
+        self.lengths = {}
+        self.doc_terms = {}
+        self.total_length = 0.0
+        self.loaded = False
+
+    def _add(self, game_id, title, description):
+        counts = Counter()
+        for token in tokenize(title):
+            counts[token] += TITLE_WEIGHT
+        for token in tokenize(description):
+            counts[token] += DESCRIPTION_WEIGHT
+        length = sum(counts.values())
+        self.lengths[game_id] = length
+        self.doc_terms[game_id] = list(counts)
+        self.total_length += length
+        for term, weight in counts.items():
+            docs = self.postings.get(term)
+            if docs is None:
+                docs = self.postings[term] = {}
+                bisect.insort(self.terms, term)
+            docs[game_id] = weight
+
+    def _remove(self, game_id):
+        length = self.lengths.pop(game_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in self.doc_terms.pop(game_id, ()):
+            self.postings[term].pop(game_id, None)
+
+    def load(self, chunk_size=5000):
+        with self._lock:
+            if self.loaded:
+                return
+            last_id = 0
+            while True:
+                rows = db.session.query(Game.id, Game.title, Game.description).filter(
+                    Game.id > last_id
+                ).order_by(Game.id).limit(chunk_size).all()
+                if not rows:
+                    break
+                for row in rows:
+                    self._add(row.id, row.title, row.description)
+                last_id = rows[-1].id
+            self.loaded = True
+
+    def apply(self, upserts, deletes):
+        with self._lock:
+            if not self.loaded:
+                return
+            for game_id in deletes:
+                self._remove(game_id)
+            for game_id, title, description in upserts:
+                self._remove(game_id)
+                self._add(game_id, title, description)
+
+    def _expand(self, prefix):
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + '\uffff')
+        return self.terms[start:end]
+
+    def search(self, terms, limit, offset):
+        self.load()
+        with self._lock:
+            total_docs = len(self.lengths)
+            if not total_docs:
+                return []
+            avg_length = self.total_length / total_docs
+            scores = None
+            for prefix in terms:
+                # Todos los términos deben aparecer (AND); cada uno admite prefijo
+                matched = {}
+                for term in self._expand(prefix):
+                    docs = self.postings[term]
+                    if not docs:
+                        continue
+                    idf = math.log(1 + (total_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                    for game_id, tf in docs.items():
+                        norm = tf + self.k1 * (1 - self.b + self.b * self.lengths[game_id] / avg_length)
+                        score = idf * tf * (self.k1 + 1) / norm
+                        matched[game_id] = max(matched.get(game_id, 0.0), score)
+                if scores is None:
+                    scores = matched
+                else:
+                    scores = {game_id: scores[game_id] + s for game_id, s in matched.items() if game_id in scores}
+                if not scores:
+                    return []
+            ranked = heapq.nsmallest(offset + limit, scores.items(), key=lambda item: (-item[1], item[0]))
+            return [game_id for game_id, _ in ranked[offset:]]
+
+
+#########################################################
+#                                                       #
+#                      BÚSQUEDA                         #
+#                                                       #
+#########################################################
+
+class GameSearch:
+
+    def __init__(self):
+        self.backend = None
+        self._lock = threading.Lock()
+        self._memory = InvertedIndexBackend()
+
+    def init_app(self, app):
+        app.extensions['game_search'] = self
+
+    def _select_backend(self):
+        if db.engine.dialect.name == 'sqlite':
+            try:
+                with db.engine.begin() as connection:
+                    FTS5Backend.install(connection)
+                return FTS5Backend()
+            except OperationalError:
+                # SQLite compilado sin FTS5
+                pass
+        return self._memory
+
+    def get_backend(self):
+        if self.backend is None:
+            with self._lock:
+                if self.backend is None:
+                    self.backend = self._select_backend()
+        return self.backend
+
+    def reindex(self, condition):
+        # Para escrituras masivas (Core) que no pasan por los eventos de sesión;
+        # FTS5 ya se mantiene con triggers
+        if self.backend is not self._memory:
+            return
+        rows = db.session.query(Game.id, Game.title, Game.description).filter(condition).all()
+        self._memory.apply(rows, ())
+
+    def search(self, text, limit, offset=0):
+        terms = tokenize(text)
+        if not terms:
+            return []
+        return self.get_backend().search(terms, limit, offset)
+
+
+game_search = GameSearch()
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def collect_game_changes(session, flush_context):
+    if game_search.backend is not game_search._memory:
+        return
+    pending = session.info.setdefault('search_changes', ({}, set()))
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Game):
+            pending[0][obj.id] = (obj.id, obj.title, obj.description)
+    for obj in session.deleted:
+        if isinstance(obj, Game):
+            pending[0].pop(obj.id, None)
+            pending[1].add(obj.id)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def apply_game_changes(session):
+    upserts, deletes = session.info.pop('search_changes', ({}, set()))
+    if upserts or deletes:
+        game_search._memory.apply(upserts.values(), deletes)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def discard_game_changes(session):
+    session.info.pop('search_changes', None)
@@ -0,0 +1,162 @@
+import random
+import time
+from datetime import datetime
+
+from models import db, Game, OrderItem
+
+# Estados del pedido y transiciones permitidas. El stock queda reservado
+# mientras el pedido está "pendiente", se consume al pasar a "completado"
+# y se devuelve al pasar a "cancelado".
+PENDING = "pendiente"
+COMPLETED = "completado"
+CANCELLED = "cancelado"
+
+ORDER_TRANSITIONS = {
+    PENDING: {COMPLETED, CANCELLED},
+    COMPLETED: set(),
+    CANCELLED: set(),
+}
+
+STOCK_MAX_RETRIES = 5
+STOCK_RETRY_BACKOFF = 0.005
+
+
+class OrderError(Exception):
+    def __init__(self, msg, status=400):
+        super().__init__(msg)
+        self.msg = msg
+        self.status = status
+
+
+class StockConflict(Exception):
+    # Otro escritor cambió la versión de algún juego entre la lectura y el UPDATE
+    pass
+
+
+def parse_order_items(items):
+    # Valida las líneas del pedido y agrupa cantidades por juego
+    if not isinstance(items, list) or not items:
+        raise OrderError("El pedido debe contener al menos un item")
+
+    lines = []
+    quantities = {}
+    for item in items:
+        try:
+            game_id = int(item["game_id"])
+            quantity = int(item["quantity"])
+        except (KeyError, TypeError, ValueError):
+            raise OrderError("Cada item debe contener game_id y quantity válidos")
+        if quantity < 1:
+            raise OrderError(f"Cantidad inválida para el juego {game_id}")
+        lines.append((game_id, quantity))
+        quantities[game_id] = quantities.get(game_id, 0) + quantity
+    return lines, quantities
+
+
+def load_stock(game_ids):
+    # Una sola consulta IN para todos los juegos referenciados
+    rows = db.session.query(Game.id, Game.title, Game.price, Game.stock, Game.version).filter(Game.id.in_(game_ids)).all()
+    return {
+        row.id: {"title": row.title, "price": row.price, "stock": row.stock or 0, "version": row.version}
+        for row in rows
+    }
+
+
+def check_stock(quantities, stock):
+    # Comprueba y descuenta sobre el stock en memoria; no escribe en la BD
+    for game_id, quantity in quantities.items():
+        game = stock.get(game_id)
+        if game is None:
+            raise OrderError(f"Juego con id {game_id} no existe", 404)
+        if game["stock"] < quantity:
+            raise OrderError(f"No hay suficiente stock para {game['title']}")
+    for game_id, quantity in quantities.items():
+        stock[game_id]["stock"] -= quantity
+
+
+def apply_stock_deltas(deltas, stock=None):
+    # Compare-and-swap sobre Game.version: un único UPDATE que solo toca las
+    # filas cuya versión no ha cambiado desde la lectura. stock es la lectura
+    # ya hecha por el llamador, si la tiene (ver load_stock)
+    if not deltas:
+        return
+    if stock is None:
+        stock = load_stock(list(deltas))
+    for game_id, delta in deltas.items():
+        game = stock.get(game_id)
+        if game is None:
+            raise OrderError(f"Juego con id {game_id} no existe", 404)
+        if game["stock"] + delta < 0:
+            raise OrderError(f"No hay suficiente stock para {game['title']}")
+
+    amount = db.case(deltas, value=Game.id)
+    expected = db.case({game_id: stock[game_id]["version"] for game_id in deltas}, value=Game.id)
+    result = db.session.execute(
+        db.update(Game)
+        .where(Game.id.in_(list(deltas)), Game.version == expected, Game.stock + amount >= 0)
+        .values(stock=Game.stock + amount, version=Game.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(deltas):
+        raise StockConflict()
+
+
+def reserve_stock(quantities, stock=None):
+    apply_stock_deltas({game_id: -quantity for game_id, quantity in quantities.items()}, stock)
+
+
+def release_stock(quantities):
+    apply_stock_deltas(dict(quantities))
+
+
+def with_stock_retry(unit_of_work):
+    # Ejecuta la unidad de trabajo completa (incluido el commit); ante un
+    # conflicto de versión deshace la transacción y reintenta con espera
+    for attempt in range(STOCK_MAX_RETRIES):
+        try:
+            return unit_of_work()
+        except StockConflict:
+            db.session.rollback()
+            time.sleep(STOCK_RETRY_BACKOFF * (2 ** attempt) * random.random())
+        except Exception:
+            db.session.rollback()
+            raise
+    raise OrderError("El stock cambió durante la operación, vuelve a intentarlo", 409)
+
+
+def order_quantities(order_id):
+    rows = db.session.query(OrderItem.game_id, db.func.sum(OrderItem.quantity)).filter(
+        OrderItem.order_id == order_id
+    ).group_by(OrderItem.game_id).all()
+    return {game_id: quantity for game_id, quantity in rows}
+
+
+def holds_stock(order):
+    return (order.status or PENDING) == PENDING
+
+
+def transition_order(order, new_status):
+    # Valida el cambio de estado y libera la reserva si se cancela.
+    # Devuelve los juegos cuyo stock ha cambiado.
+    current = order.status or PENDING
+    if new_status not in ORDER_TRANSITIONS:
+        raise OrderError(f"Estado inválido: {new_status}")
+    if new_status == current:
+        return {}
+    if new_status not in ORDER_TRANSITIONS[current]:
+        raise OrderError(f"No se puede pasar un pedido de '{current}' a '{new_status}'", 409)
+
+    released = {}
+    if new_status == CANCELLED:
+        released = order_quantities(order.id)
+        release_stock(released)
+    order.status = new_status
+    return released
+
+
+def discard_order(order):
+    # Borrado lógico; si el pedido estaba pendiente se devuelve su reserva de stock
+    released = order_quantities(order.id) if holds_stock(order) else {}
+    release_stock(released)
+    order.deleted_at = datetime.utcnow()
+    return released
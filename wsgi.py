@@ -0,0 +1,86 @@
+"""Punto de entrada de producción.
+
+Con waitress (multiplataforma, un proceso con varios hilos):
+
+    python wsgi.py
+
+Con gunicorn (Linux), ver gunicorn.conf.py:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+La caché de juegos, las revocaciones de tokens y los cubos del limitador
+viven en memoria del proceso. Mientras no se sustituyan aquí por
+implementaciones compartidas (cache.CacheBackend, ratelimit.RateLimitStore)
+solo se puede servir con un proceso y varios hilos; gunicorn.conf.py no
+arranca más de un worker en ese caso.
+
+El esquema no se crea al arrancar: `flask --app app init-db` en una BD nueva
+o `flask --app app db upgrade` en una existente.
+"""
+import logging
+import signal
+import sys
+
+import auth
+from app import app, passwords, game_cache
+from cache import LocalCache
+from config import env
+from models import db
+from ratelimit import rate_limiter, LocalRateLimitStore
+
+logger = logging.getLogger(__name__)
+
+
+def process_local_state():
+    # Estado que no se comparte entre procesos: con varios workers cada uno
+    # serviría precios que otro ya ha cambiado, aceptaría tokens que otro ha
+    # revocado y multiplicaría los límites por el número de workers
+    local = []
+    if isinstance(game_cache, LocalCache):
+        local.append('caché de juegos (app.game_cache)')
+    if isinstance(auth.revocations, LocalCache):
+        local.append('revocaciones de tokens (auth.revocations)')
+    if app.config['RATELIMIT_ENABLED'] and isinstance(rate_limiter.store, LocalRateLimitStore):
+        local.append('limitador de peticiones (rate_limiter.store)')
+    return local
+
+
+def shutdown():
+    # Libera lo que el proceso tiene abierto: conexiones del pool y procesos
+    # del hashing de contraseñas
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    passwords.shutdown()
+
+
+def serve():
+    from waitress import create_server
+
+    server = create_server(
+        app,
+        listen=env('WEB_BIND', '0.0.0.0:8000'),
+        threads=env('WEB_THREADS', 8, int),
+        connection_limit=env('WEB_CONNECTION_LIMIT', 200, int),
+        channel_timeout=env('WEB_TIMEOUT', 30, int),
+        ident='tienda'
+    )
+
+    def stop(signum, frame):
+        # waitress atiende SystemExit dejando terminar las peticiones en curso
+        # (hasta 5 s) antes de cerrar
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logging.basicConfig(level=logging.INFO)
+    logger.info("Sirviendo en %s con %s hilos", server.effective_host, server.adj.threads)
+    try:
+        server.run()
+    finally:
+        shutdown()
+        logger.info("Servidor detenido")
+
+
+if __name__ == '__main__':
+    sys.exit(serve())